@@ -1,55 +1,308 @@
-from typing import Callable, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
-import parameters
+import numpy as np
+
+from config import Config
+from game import Game
+from perfect_play import PerfectPlayTable
+from transposition_table import TranspositionTable
 from TreeNode import TreeNode
+from world.batch_hex import BatchHex
+from world.hex_symmetry import HexSymmetry
 from world.simulated_world import SimulatedWorld
+from world.zobrist import Zobrist
 
 Policy = Callable[[Tuple[int, ...], Tuple[int, ...]], int]  # (s, valid_actions) -> a
+BatchPolicy = Callable[[List[Tuple[int, ...]], List[Tuple[int, ...]]], List[int]]  # ([s], [valid_actions]) -> [a]
+RootStatistics = Dict[int, Tuple[Tuple[int, ...], int, float]]  # a -> (s, visits, score)
+PriorFunction = Callable[[Tuple[int, ...], Tuple[int, ...]], Sequence[float]]  # (s, valid_actions) -> P(a)
+ValueFunction = Callable[[Tuple[int, ...]], float]  # s -> expected reward for player 1 in [-1, 1]
 
 
 class MCTS:
 
-    def __init__(self, initial_state: Tuple[int, ...]) -> None:
-        self.root = TreeNode(initial_state)
-        self.action_space = parameters.NUMBER_OF_ACTIONS
+    def __init__(
+        self,
+        initial_state: Tuple[int, ...],
+        prior_function: Optional[PriorFunction] = None,
+        perfect_play_table: Optional[PerfectPlayTable] = None,
+        value_function: Optional[ValueFunction] = None,
+        config: Optional[Config] = None,
+    ) -> None:
+        config = config or Config.get_default()
+        # Shares nodes between a Hex position and its 180 degree rotation. Nodes then hold canonical states,
+        # and actions are remapped whenever a node's state is the rotation of the simulated world's state.
+        self.symmetric = config.HEX_SYMMETRY and config.GAME_TYPE == Game.Hex and config.TRANSPOSITION_TABLE_SIZE > 0
+        self.__root_is_rotated = False  # Whether the root's state is the rotation of the actual game's state
+        if self.symmetric:
+            initial_state, self.__root_is_rotated = HexSymmetry.canonicalize(initial_state)
+        self.root = TreeNode(initial_state, config=config)
+        self.config = config
+        self.action_space = config.NUMBER_OF_ACTIONS
+        self.prior_function = prior_function  # Switches the tree policy from UCT to PUCT
+        self.reuse_statistics: List[Tuple[int, int]] = []  # (visits inherited by the new root, visits of the old root) per move
+        self.solver = config.MCTS_SOLVER  # Proves wins and losses and backs them up with minimax semantics
+        self.perfect_play_table = perfect_play_table  # Exact winners of solved positions, replacing their rollouts
+        self.value_function = value_function  # Evaluates leaves after leaf_rollout_depth plies instead of rolling out to the end
+        self.leaf_rollout_depth = config.LEAF_ROLLOUT_DEPTH
+        self.batch_rollouts = config.BATCH_HEX_ROLLOUTS and config.GAME_TYPE == Game.Hex  # Batched rollouts run on one BatchHex
+
+        # Shares nodes between transpositions, turning the tree into a DAG
+        self.transposition_table: Optional[TranspositionTable] = None
+        if config.TRANSPOSITION_TABLE_SIZE > 0:
+            self.transposition_table = TranspositionTable(config.TRANSPOSITION_TABLE_SIZE)
+            self.transposition_table.put(Zobrist.hash_state(self.root.state), self.root)
+
+    def choose_action(self) -> int:
+        """
+        The root child chosen by the tree policy. The anytime search stops once the most visited child can no longer
+        be overtaken, so with it the most visited child is played instead, unless a child is a proven win.
+        """
+        if self.config.ANYTIME_SEARCH:
+            children, player = self.root.children, self.root.state[0]
+            action = max(children, key=lambda a: (children[a].proven_winner == player, children[a].visits))
+        else:
+            action = self.root.tree_policy()
+        return self.__to_world_action(action, self.__root_is_rotated)
 
     def update_root(self, action: int) -> None:
-        self.root = self.root.children[action]
-        self.root.parent = None
+        action = self.__to_world_action(action, self.__root_is_rotated)  # The remap is its own inverse
+        old_root, self.root = self.root, self.root.children[action]
+        if self.symmetric:
+            self.__root_is_rotated ^= HexSymmetry.generate_state(old_root.state, action) != self.root.state
+        self.reuse_statistics.append((self.root.visits, old_root.visits))
+        self.root.detach()
+
+        # Nodes in discarded subtrees can still be reached through the transposition table
+        if self.transposition_table is None:
+            old_root.release(keep=self.root)
+        else:
+            # The new root's entry may have been evicted or refer to another node of the same position,
+            # and every transposition into the root must update the root itself
+            self.transposition_table.put(Zobrist.hash_state(self.root.state), self.root)
+
+    def get_root_statistics(self) -> RootStatistics:
+        return {action: (child.state, child.visits, child.score) for action, child in self.root.children.items()}
+
+    def merge_root_statistics(self, root_visits: int, statistics: RootStatistics) -> None:
+        """
+        Adds the root statistics of an independently grown tree to this tree's root.
+        """
+        self.root.visits += root_visits
+        for action, (state, visits, score) in statistics.items():
+            if action not in self.root.children:
+                self.root.add_node(action, state)
+            child = self.root.children[action]
+            child.visits += visits
+            child.score += score
+
+    def get_child_visits(self) -> List[int]:
+        return [child.visits for child in self.root.children.values()]
 
     def get_normalized_distribution(self) -> Tuple[float, ...]:
+        # Normalized by the children's visits, since shared children can be visited through other parents
+        total_visits = sum(child.visits for child in self.root.children.values())
         distribution = []
         for action in range(self.action_space):
             if action in self.root.children:
-                distribution.append(float(self.root.children[action].visits) / float(self.root.visits))
+                distribution.append(float(self.root.children[action].visits) / float(total_visits))
             else:
                 distribution.append(0.0)
+        if self.__root_is_rotated:
+            return HexSymmetry.rotate_distribution(distribution)
         return tuple(distribution)
 
-    def do_one_simulation(self, default_policy: Policy, world: SimulatedWorld) -> None:
+    def __to_world_action(self, action: int, is_rotated: bool) -> int:
+        """
+        Maps an action of a node to the world the node is reached in, and back.
+        """
+        return HexSymmetry.rotate_action(action, self.action_space) if is_rotated else action
+
+    def __expand(self, node: TreeNode, world: SimulatedWorld, is_rotated: bool) -> None:
+        legal_actions = world.get_legal_actions()
+        if is_rotated:
+            legal_actions = HexSymmetry.rotate_distribution(legal_actions)
+        for action, legal in enumerate(legal_actions):
+            if bool(legal):
+                if self.transposition_table is None:
+                    node.add_node(action, world.generate_state(action))
+                    continue
+                if self.symmetric:
+                    state, _ = HexSymmetry.canonicalize(world.generate_state(self.__to_world_action(action, is_rotated)))
+                    state_hash = Zobrist.hash_state(state)
+                else:
+                    state_hash = world.generate_state_hash(action)
+                child_node = self.transposition_table.get(state_hash)
+                if child_node is None:
+                    child_node = node.add_node(action, state if self.symmetric else world.generate_state(action))
+                    self.transposition_table.put(state_hash, child_node)
+                else:
+                    node.link_node(action, child_node)
+        if self.prior_function is not None:
+            node.set_priors(self.prior_function(node.state, legal_actions))
+
+    def __select(self, world: SimulatedWorld) -> List[TreeNode]:
+        """
+        Returns the path from the root to the node where the rollout starts.
+        Backpropagation follows this path, as nodes in a DAG can have several parents.
+        """
         # Tree search
         current_node = self.root
-        while current_node.is_not_leaf:
+        path = [current_node]
+        is_rotated = self.symmetric and world.get_state() != current_node.state
+        # Proven nodes need no search below them, but a proven root keeps steering visits to its proven moves
+        while current_node.is_not_leaf and (current_node is self.root or not current_node.proven_winner):
             action = current_node.tree_policy()  # returns action to child node with highest UCT value
-            world.step(action)
+            state, _ = world.step(self.__to_world_action(action, is_rotated))
             current_node = current_node.children[action]
+            is_rotated = self.symmetric and state != current_node.state
+            path.append(current_node)
 
         # Node expansion. Always expand the root
-        if not world.is_final_state() and (current_node.visits != 0 or current_node.parent is None):
-            for action, legal in enumerate(world.get_legal_actions()):
-                if bool(legal):
-                    current_node.add_node(action, world.generate_state(action))
-            current_node = list(current_node.children.values())[0]
-
-        # Rollout
-        current_state = current_node.state
-        while not world.is_final_state():
-            legal_actions = world.get_legal_actions()
-            action = default_policy(current_state, legal_actions)
-            current_state, _ = world.step(action)
+        if not world.is_final_state() and not current_node.proven_winner and (current_node.visits != 0 or current_node is self.root):
+            self.__expand(current_node, world, is_rotated)
+            action = next(iter(current_node.children))
+            world.step(self.__to_world_action(action, is_rotated))
+            path.append(current_node.children[action])
+        return path
+
+    def __get_proven_winner(self, node: TreeNode, world: SimulatedWorld) -> int:
+        """
+        Returns the winner from node when it needs no rollout, 0 otherwise.
+        The solver marks terminal nodes and nodes found in the perfect play table as proven.
+        """
+        if node.proven_winner:
+            return node.proven_winner
+        winner = 0
+        if self.perfect_play_table is not None:
+            winner = self.perfect_play_table.get_winner(world.get_state_hash())
+        if self.solver:
+            if not winner and world.is_final_state():
+                winner = world.get_winner_id()
+            node.proven_winner = winner
+        return winner
+
+    def __propagate_proof(self, path: List[TreeNode]) -> None:
+        """
+        Proves the ancestors of the leaf that the leaf's proof resolves, stopping at the first unresolved one.
+        """
+        for node in reversed(path[:-1]):
+            if node.proven_winner:
+                break
+            winner = node.solve()
+            if not winner:
+                break
+            node.proven_winner = winner
+
+    def __is_truncated(self, depth: int) -> bool:
+        return self.value_function is not None and depth >= self.leaf_rollout_depth
+
+    def __evaluate(self, world: SimulatedWorld, state: Tuple[int, ...]) -> float:
+        """
+        Reward for player 1 where the rollout stopped: the game result, or the value function's estimate of a truncated rollout.
+        """
+        if world.is_final_state():
+            return float(TreeNode.player_reward[world.get_winner_id()])
+        return self.value_function(state)
+
+    def do_one_simulation(self, default_policy: Policy, world: SimulatedWorld) -> None:
+        path = self.__select(world)
+
+        # Rollout, unless the leaf is proven
+        winner = self.__get_proven_winner(path[-1], world)
+        if winner:
+            reward = float(TreeNode.player_reward[winner])
+        else:
+            current_state = world.get_state()  # The leaf's state, as the world sees it
+            depth = 0
+            while not world.is_final_state() and not self.__is_truncated(depth):
+                legal_actions = world.get_legal_actions()
+                action = default_policy(current_state, legal_actions)
+                current_state, _ = world.step(action)
+                depth += 1
+            reward = self.__evaluate(world, current_state)
+
+        # Backpropagation
+        for node in path:
+            node.add_value(reward)
+            node.increment_visit_count()
+        if self.solver:
+            self.__propagate_proof(path)
+
+    def __run_rollouts(self, default_policy: BatchPolicy, worlds: List[SimulatedWorld], winners: List[int]) -> List[float]:
+        states = [world.get_state() for world in worlds]
+        active = [i for i, world in enumerate(worlds) if not winners[i] and not world.is_final_state()]
+        depth = 0
+        while active and not self.__is_truncated(depth):
+            legal_actions = [worlds[i].get_legal_actions() for i in active]
+            actions = default_policy([states[i] for i in active], legal_actions)
+            for i, action in zip(active, actions):
+                states[i], _ = worlds[i].step(action)
+            active = [i for i in active if not worlds[i].is_final_state()]
+            depth += 1
+        return [
+            float(TreeNode.player_reward[winner]) if winner else self.__evaluate(world, state)
+            for world, winner, state in zip(worlds, winners, states)
+        ]
+
+    def __run_vectorized_rollouts(self, default_policy: BatchPolicy, worlds: List[SimulatedWorld], winners: List[int]) -> List[float]:
+        """
+        Rolls out the unproven leaves of unfinished worlds together on one BatchHex. The worlds stay at the leaves.
+        """
+        rewards = [0.0] * len(worlds)
+        active = []
+        for i, (world, winner) in enumerate(zip(worlds, winners)):
+            if winner or world.is_final_state():
+                rewards[i] = float(TreeNode.player_reward[winner or world.get_winner_id()])
+            else:
+                active.append(i)
+        if not active:
+            return rewards
+        batch_world = BatchHex(len(active), self.config)
+        batch_world.reset([worlds[i].get_state() for i in active])
+        depth = 0
+        while not batch_world.is_final_state().all() and not self.__is_truncated(depth):
+            running = np.flatnonzero(~batch_world.is_final_state())
+            states = batch_world.get_states()
+            legal_actions = batch_world.get_legal_actions().tolist()
+            actions = np.zeros(len(active), dtype=np.intp)
+            actions[running] = default_policy([states[i] for i in running], [tuple(legal_actions[i]) for i in running])
+            batch_world.step(actions)
+            depth += 1
+
+        states = batch_world.get_states()
+        for i, winner, state in zip(active, batch_world.get_winner_ids().tolist(), states):
+            rewards[i] = float(TreeNode.player_reward[winner]) if winner else self.value_function(state)
+        return rewards
+
+    def do_batched_simulations(self, default_policy: BatchPolicy, worlds: List[SimulatedWorld]) -> None:
+        """
+        Runs one simulation per world in lockstep. Virtual loss is applied along every selected path
+        so the simulations spread out over the tree, and the rollouts query the default policy once per ply
+        for all unfinished worlds.
+        """
+        paths: List[List[TreeNode]] = []
+
+        for world in worlds:
+            path = self.__select(world)
+
+            # Virtual loss, reverted during backpropagation
+            for node in path:
+                node.add_virtual_loss()
+            paths.append(path)
+
+        # Rollout, unless the leaf is proven
+        winners = [self.__get_proven_winner(path[-1], world) for path, world in zip(paths, worlds)]
+        if self.batch_rollouts:
+            rewards = self.__run_vectorized_rollouts(default_policy, worlds, winners)
+        else:
+            rewards = self.__run_rollouts(default_policy, worlds, winners)
 
         # Backpropagation
-        while current_node is not None:
-            current_node.add_reward(world.get_winner_id())
-            current_node.increment_visit_count()
-            current_node = current_node.parent
+        for path, reward in zip(paths, rewards):
+            for node in path:
+                node.revert_virtual_loss()
+                node.add_value(reward)
+                node.increment_visit_count()
+            if self.solver:
+                self.__propagate_proof(path)
@@ -0,0 +1,162 @@
+import os
+from itertools import combinations
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from game import Game
+from numpy_anet import NumpyANET
+from pairing_results import PairingResults, hash_model_file
+from visualize import Visualize
+from world.batch_hex import BatchHex
+from world.simulated_world_factory import SimulatedWorldFactory
+
+PairingResult = Tuple[str, str, int, int]  # (filename of agent 1, filename of agent 2, wins of agent 1, wins of agent 2)
+
+# Per-process ANETs of the pool workers, by filename
+_worker_anets: Dict[str, NumpyANET] = {}
+
+
+class WorldBatch:
+    """
+    Games of any SimulatedWorld played in lockstep, with the interface of BatchHex.
+    """
+
+    def __init__(self, batch_size: int, config: Optional[Config] = None) -> None:
+        self.__worlds = [SimulatedWorldFactory.get_simulated_world(config=config) for _ in range(batch_size)]
+
+    def get_states(self) -> np.ndarray:
+        return np.array([world.get_state() for world in self.__worlds])
+
+    def get_legal_actions(self) -> np.ndarray:
+        return np.array([world.get_legal_actions() for world in self.__worlds])
+
+    def is_final_state(self) -> np.ndarray:
+        return np.array([world.is_final_state() for world in self.__worlds])
+
+    def get_winner_ids(self) -> np.ndarray:
+        return np.array([world.get_winner_id() for world in self.__worlds])
+
+    def step(self, actions: np.ndarray) -> None:
+        for world, action in zip(self.__worlds, actions):
+            if not world.is_final_state():
+                world.step(int(action))
+
+
+def play_games(agent_1: NumpyANET, agent_2: NumpyANET, number_of_games: int, config: Optional[Config] = None) -> Tuple[int, int]:
+    """
+    Plays greedy games between two agents, each starting every other game, and returns the wins of each.
+    The games are played simultaneously, so every ply is one batched prediction per agent.
+    """
+    config = config or Config.get_default()
+    batch_world = BatchHex(number_of_games, config) if config.GAME_TYPE == Game.Hex else WorldBatch(number_of_games, config)
+    agents = (agent_1, agent_2)
+    starting_agents = np.arange(number_of_games) % 2  # Index of the agent playing player 1 in each game
+
+    while not batch_world.is_final_state().all():
+        states = np.asarray(batch_world.get_states())
+        legal_actions = batch_world.get_legal_actions()
+        running = ~batch_world.is_final_state()
+        moving_agents = starting_agents ^ (states[:, 0] == 2)
+        actions = np.zeros(number_of_games, dtype=np.intp)
+        for agent_index, agent in enumerate(agents):
+            games = np.flatnonzero(running & (moving_agents == agent_index))
+            if len(games) > 0:
+                actions[games] = agent.choose_greedy_batch(states[games], legal_actions[games])
+        batch_world.step(actions)
+
+    winning_agents = starting_agents ^ (np.asarray(batch_world.get_winner_ids()) == 2)
+    wins_of_agent_2 = int(winning_agents.sum())
+    return number_of_games - wins_of_agent_2, wins_of_agent_2
+
+
+def _play_pairing(pairing: Tuple[str, str], number_of_games: int, config: Config) -> PairingResult:
+    for filename in pairing:
+        if filename not in _worker_anets:
+            _worker_anets[filename] = NumpyANET(filename, epsilon=0)
+    wins_1, wins_2 = play_games(_worker_anets[pairing[0]], _worker_anets[pairing[1]], number_of_games, config)
+    return pairing[0], pairing[1], wins_1, wins_2
+
+
+def play_pairings(pairings: List[Tuple[str, str]], number_of_games: int, number_of_workers: int, config: Config) -> List[PairingResult]:
+    """
+    Plays every pairing of model files, over a pool of processes when there is more than one worker.
+    """
+    if number_of_workers > 1 and len(pairings) > 1:
+        with get_context('spawn').Pool(number_of_workers) as pool:
+            return pool.starmap(_play_pairing, [(pairing, number_of_games, config) for pairing in pairings])
+    return [_play_pairing(pairing, number_of_games, config) for pairing in pairings]
+
+
+class TOPP:
+    """
+    Tournament of Progressive Policies
+
+    ...
+
+    Every ANET cached during training plays NUMBER_OF_GAMES greedy games against every other, starting half of them.
+    The pairings are spread over a pool of TOPP_WORKERS processes, and within a pairing all games are
+    played simultaneously with NumPy ANETs, so each ply is one batched prediction per agent.
+    With a TOPP_RESULTS_FILE, results are stored by the hashes of the model files and NUMBER_OF_GAMES, and pairings already
+    in the store are not played again.
+
+    Methods
+    -------
+    run() -> Dict[str, int]:
+        Plays the tournament, prints the wins of each agent, plots them and returns them.
+    get_agents() -> Dict[str, str]:
+        Filenames of the cached ANETs by agent name, in episode order.
+    """
+
+    def __init__(self, config: Optional[Config] = None) -> None:
+        self.__config = config or Config.get_default()
+        self.__number_of_games = self.__config.NUMBER_OF_GAMES
+        self.__number_of_workers = self.__config.TOPP_WORKERS
+        self.__model_directory = self.__config.TOPP_MODEL_DIRECTORY
+        self.__results_filename = self.__config.TOPP_RESULTS_FILE
+
+    def get_agents(self) -> Dict[str, str]:
+        episodes = sorted(
+            int(filename[:-3]) for filename in os.listdir(self.__model_directory)
+            if filename.endswith('.h5') and filename[:-3].isdigit()
+        )
+        return {f'Agent-e{episode}': os.path.join(self.__model_directory, f'{episode}.h5') for episode in episodes}
+
+    def run(self) -> Dict[str, int]:
+        agents = self.get_agents()
+        agent_names = {filename: name for name, filename in agents.items()}
+        pairings: List[Tuple[str, str]] = list(combinations(agents.values(), 2))
+
+        if self.__results_filename is None:
+            results = play_pairings(pairings, self.__number_of_games, self.__number_of_workers, self.__config)
+        else:
+            results = self.__play_new_pairings(pairings)
+
+        statistics = {name: 0 for name in agents}
+        games = {name: 0 for name in agents}
+        for filename_1, filename_2, wins_1, wins_2 in results:
+            for filename in (filename_1, filename_2):
+                games[agent_names[filename]] += wins_1 + wins_2
+            statistics[agent_names[filename_1]] += wins_1
+            statistics[agent_names[filename_2]] += wins_2
+
+        for name, wins in statistics.items():
+            print(f'{name:>10} won {wins}/{games[name]} games')
+        Visualize.plot_win_statistics(statistics)
+        return statistics
+
+    def __play_new_pairings(self, pairings: List[Tuple[str, str]]) -> List[PairingResult]:
+        """
+        Plays the pairings missing from the results store, and returns the stored results of all pairings.
+        """
+        stored_results = PairingResults(self.__results_filename, self.__number_of_games)
+        model_hashes = {filename: hash_model_file(filename) for pairing in pairings for filename in pairing}
+        new_pairings = [pairing for pairing in pairings if stored_results.get(model_hashes[pairing[0]], model_hashes[pairing[1]]) is None]
+        print(f'Playing {len(new_pairings)} new of {len(pairings)} pairings')
+
+        for filename_1, filename_2, wins_1, wins_2 in play_pairings(new_pairings, self.__number_of_games, self.__number_of_workers, self.__config):
+            stored_results.add(model_hashes[filename_1], model_hashes[filename_2], wins_1, wins_2)
+        stored_results.save()
+        return [(filename_1, filename_2, *stored_results.get(model_hashes[filename_1], model_hashes[filename_2])) for filename_1, filename_2 in pairings]
@@ -1,55 +1,149 @@
 from __future__ import annotations
 
 from math import log, sqrt
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Sequence, Tuple
 
-import parameters
+from config import Config
 
 
 class TreeNode:
+    """
+    Node in the Monte Carlo tree.
+
+    A node holds its visits, its score for player 1 and the winner proven by the MCTS-Solver.
+    The tree policy scores the children with UCT, or with PUCT once priors are set, against the visits
+    of the node choosing, since nodes shared through a transposition table have several parents.
+    """
 
     player_reward = {
         1: 1,
         2: -1
     }
 
-    def __init__(self, state: Tuple[int, ...], parent: Optional[TreeNode] = None) -> None:
+    def __init__(self, state: Tuple[int, ...], parent: Optional[TreeNode] = None, config: Optional[Config] = None) -> None:
         self.state = state
         self.parent = parent
+        self.config = config or (parent.config if parent is not None else Config.get_default())
         self.children: Dict[int, TreeNode] = {}
+        self.child_priors: Optional[Dict[int, float]] = None  # Prior probability of each child by action, only with PUCT
 
-        self.score = 0
+        self.score = 0.0  # Sum of rewards for player 1, fractional with a value function
         self.visits = 0
-
-        self.c = -parameters.UCT_C if state[0] == 1 else parameters.UCT_C
-        self.policy_function = max if self.state[0] == 1 else min
-
-    @property
-    def UCT(self) -> float:
-        if self.visits == 0:
-            return self.c * float("inf")
-        exploitation = self.score / self.visits
-        exploration = self.c * sqrt(2 * log(self.parent.visits) / (self.visits))
-        return exploitation + exploration
+        self.proven_winner = 0  # The winner under perfect play from this node once the MCTS-Solver has proven it
+
+    def detach(self) -> None:
+        """
+        Makes the node a root, so that its parent and the parent's other children can be released.
+        """
+        self.parent = None
+
+    def release(self, keep: Optional[TreeNode] = None) -> None:
+        """
+        Breaks the references within this node's subtree, except into the subtree of keep.
+        Parents and children reference each other, so without this a discarded subtree
+        is only freed once the cycle collector runs.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            stack.extend(child for child in node.children.values() if child is not keep)
+            node.parent = None
+            node.children = {}
+            node.child_priors = None
+
+    def set_priors(self, priors: Sequence[float]) -> None:
+        """
+        Sets the prior probability of every child, indexed by action, which switches the tree policy to PUCT.
+        """
+        self.child_priors = {action: float(priors[action]) for action in self.children}
+
+    def solve(self) -> int:
+        """
+        Returns the winner proven by the children, or 0. The player to move wins if any child is a proven win,
+        and loses once every child is a proven win for the opponent. Expansion adds every legal child at once.
+        """
+        winners = [child.proven_winner for child in self.children.values()]
+        player = self.state[0]
+        if player in winners:
+            return player
+        if all(winners):
+            return 2 if player == 1 else 1
+        return 0
 
     def tree_policy(self) -> int:
-        return self.policy_function(self.children.keys(), key=lambda key: self.children[key].UCT)
+        """
+        Returns the action to the child with the best UCT value, or PUCT value with priors, for the player to move.
+        Ties go to the first child in insertion order. A proven win is always chosen,
+        and a proven loss only once every child is one.
+        """
+        player = self.state[0]
+        sign = TreeNode.player_reward[player]  # Scores are rewards for player 1, which player 2 minimizes
+        uct_c = self.config.UCT_C
+        priors = self.child_priors
+        if priors is None:
+            exploration_numerator = 2 * log(max(self.visits, 1))
+        else:
+            exploration_numerator = uct_c * sqrt(max(self.visits, 1))
+
+        best_action, best_value = -1, -float("inf")
+        best_loss_action, best_loss_value = -1, -float("inf")
+        for action, child in self.children.items():
+            visits = child.visits
+            if priors is not None:
+                exploitation = sign * child.score / visits if visits > 0 else 0.0
+                value = exploitation + exploration_numerator * priors[action] / (1 + visits)
+            elif visits == 0:
+                value = float("inf")
+            else:
+                value = sign * child.score / visits + uct_c * sqrt(exploration_numerator / visits)
+
+            winner = child.proven_winner
+            if not winner:
+                if value > best_value:
+                    best_action, best_value = action, value
+            elif winner == player:
+                return action
+            elif value > best_loss_value:
+                best_loss_action, best_loss_value = action, value
+        return best_action if best_action != -1 else best_loss_action
 
     @property
     def is_not_leaf(self) -> bool:
         return bool(self.children)
 
-    def add_reward(self, winner: int) -> None:
-        self.score += TreeNode.player_reward[winner]
+    def add_value(self, value: float) -> None:
+        """
+        Adds a reward for player 1 in [-1, 1], the game result or a value function's estimate.
+        """
+        self.score += value
 
     def increment_visit_count(self) -> None:
         self.visits += 1
 
+    def add_virtual_loss(self) -> None:
+        """
+        Temporarily counts a pending simulation through this node as a loss for the player choosing it.
+        """
+        self.visits += 1
+        if self.parent is not None:
+            self.score -= TreeNode.player_reward[self.parent.state[0]]
+
+    def revert_virtual_loss(self) -> None:
+        self.visits -= 1
+        if self.parent is not None:
+            self.score += TreeNode.player_reward[self.parent.state[0]]
+
     def add_node(self, action: int, state: Tuple[int, ...]) -> TreeNode:
         child_node = TreeNode(state, self)
         self.children[action] = child_node
         return child_node
 
+    def link_node(self, action: int, child_node: TreeNode) -> None:
+        """
+        Adds an existing node as a child, which makes the tree a DAG.
+        """
+        self.children[action] = child_node
+
     def __eq__(self, o: TreeNode) -> bool:
         return self.state == o.state
 
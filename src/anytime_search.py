@@ -0,0 +1,83 @@
+from time import time
+from typing import Protocol, Sequence
+
+
+class SearchTree(Protocol):
+    def get_child_visits(self) -> Sequence[int]:
+        ...
+
+
+class AnytimeSearch:
+    """
+    Decides how long to search from each root
+
+    ...
+
+    The rollout and time budgets of a move are scaled by the game phase, measured as the fraction of
+    actions still legal: (legal actions / action space) ** phase_exponent. Forced moves get a single rollout,
+    which expands the root. The search stops early once the most visited child of the root leads the second
+    by more visits than the remaining budget could add, since that child can then no longer be overtaken.
+    The searched tree must then play its most visited child, which MCTS and ArrayMCTS do with ANYTIME_SEARCH.
+
+    Methods
+    -------
+    start(number_of_legal_actions: int) -> None:
+        Starts the budget of a new move.
+    should_continue(monte_carlo_tree: SearchTree) -> bool:
+        Whether to run more simulations.
+    add_rollouts(number_of_rollouts: int) -> None:
+        Counts finished simulations.
+    """
+
+    def __init__(
+        self,
+        min_number_of_rollouts: int,
+        simulation_time_out: float,
+        action_space: int,
+        phase_exponent: float,
+        check_interval: int = 10,
+    ) -> None:
+        self.__min_number_of_rollouts = min_number_of_rollouts
+        self.__simulation_time_out = simulation_time_out
+        self.__action_space = action_space
+        self.__phase_exponent = phase_exponent
+        self.__check_interval = check_interval
+
+        self.number_of_rollouts = 0
+        self.saved_rollouts = 0  # Budgeted rollouts skipped by stopping early, over all moves
+        self.start(action_space)
+
+    def start(self, number_of_legal_actions: int) -> None:
+        if number_of_legal_actions <= 1:
+            self.__rollout_budget = 1
+            self.__time_budget = 0.0
+        else:
+            phase = (number_of_legal_actions / self.__action_space) ** self.__phase_exponent
+            self.__rollout_budget = max(1, round(self.__min_number_of_rollouts * phase))
+            self.__time_budget = self.__simulation_time_out * phase
+        self.number_of_rollouts = 0
+        self.__next_check = self.__check_interval
+        self.__start_time = time()
+
+    def add_rollouts(self, number_of_rollouts: int) -> None:
+        self.number_of_rollouts += number_of_rollouts
+
+    def should_continue(self, monte_carlo_tree: SearchTree) -> bool:
+        elapsed_time = time() - self.__start_time
+        if self.number_of_rollouts >= self.__rollout_budget and elapsed_time >= self.__time_budget:
+            return False
+        if self.number_of_rollouts < self.__next_check:
+            return True
+        self.__next_check = self.number_of_rollouts + self.__check_interval
+
+        remaining_rollouts = float(self.__rollout_budget - self.number_of_rollouts)
+        if elapsed_time < self.__time_budget:
+            rollouts_per_second = self.number_of_rollouts / max(elapsed_time, 1e-9)
+            remaining_rollouts = max(remaining_rollouts, rollouts_per_second * (self.__time_budget - elapsed_time))
+
+        visits = sorted(monte_carlo_tree.get_child_visits(), reverse=True)
+        lead = visits[0] - visits[1] if len(visits) > 1 else float('inf')
+        if lead > remaining_rollouts:
+            self.saved_rollouts += max(int(remaining_rollouts), 0)
+            return False
+        return True
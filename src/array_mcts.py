@@ -0,0 +1,252 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from game import Game
+from MCTS import BatchPolicy, Policy
+from world.simulated_world import SimulatedWorld
+
+
+class ArrayMCTS:
+    """
+    Monte Carlo Tree Search over an array-backed tree
+
+    ...
+
+    Nodes are rows in a structure of NumPy arrays instead of TreeNode objects. The children of a node
+    are allocated as one contiguous block when it is expanded, so a node only stores the index and size
+    of that block. States are not stored, the simulated world is stepped along the selected path instead.
+    Implements the same search API as MCTS, without transposition tables. Configurations enabling an MCTS option
+    the array-backed tree does not implement are rejected with a ValueError.
+
+    Methods
+    -------
+    do_one_simulation(default_policy: Policy, world: SimulatedWorld) -> None:
+        Runs one selection, expansion, rollout and backpropagation from the root.
+    do_batched_simulations(default_policy: BatchPolicy, worlds: List[SimulatedWorld]) -> None:
+        Runs one simulation per world in lockstep, see MCTS.do_batched_simulations.
+    get_child_visits() -> List[int]:
+        Visit counts of the root's children.
+    get_normalized_distribution() -> Tuple[float, ...]:
+        Visit distribution over the root's children.
+    choose_action() -> int:
+        The root child chosen by the tree policy, or the most visited one with ANYTIME_SEARCH.
+    update_root(action: int) -> None:
+        Makes the child reached by action the new root and compacts the arrays to its subtree.
+    """
+
+    player_reward = {
+        1: 1,
+        2: -1
+    }
+
+    opposite_player = {
+        1: 2,
+        2: 1,
+    }
+
+    def __init__(self, initial_state: Tuple[int, ...], capacity: int = 1024, config: Optional[Config] = None) -> None:
+        config = config or Config.get_default()
+        unsupported_options = [name for name, enabled in (
+            ('PUCT', config.PUCT),
+            ('MCTS_SOLVER', config.MCTS_SOLVER),
+            ('VALUE_NETWORK', config.VALUE_NETWORK),
+            ('PERFECT_PLAY_TABLE', config.PERFECT_PLAY_TABLE is not None),
+            ('TRANSPOSITION_TABLE_SIZE', config.TRANSPOSITION_TABLE_SIZE > 0),
+            ('BATCH_HEX_ROLLOUTS', config.BATCH_HEX_ROLLOUTS and config.GAME_TYPE == Game.Hex),
+            ('MCTS_WORKERS', config.MCTS_WORKERS > 1),  # The workers grow MCTS trees
+        ) if enabled]
+        if unsupported_options:
+            raise ValueError(f'ARRAY_BACKED_TREE does not support {", ".join(unsupported_options)}')
+        self.action_space = config.NUMBER_OF_ACTIONS
+        self.__uct_c = config.UCT_C
+        self.__choose_most_visited = config.ANYTIME_SEARCH  # The anytime search only settles the most visited child
+
+        self.__parents = np.full(capacity, -1, dtype=np.int32)
+        self.__first_children = np.full(capacity, -1, dtype=np.int32)
+        self.__number_of_children = np.zeros(capacity, dtype=np.int16)
+        self.__actions = np.zeros(capacity, dtype=np.int16)
+        self.__players = np.zeros(capacity, dtype=np.int8)  # Player to move in the node
+        self.__visits = np.zeros(capacity, dtype=np.int32)
+        self.__scores = np.zeros(capacity, dtype=np.int32)
+        self.__number_of_nodes = 0
+        self.reuse_statistics: List[Tuple[int, int]] = []  # (visits inherited by the new root, visits of the old root) per move
+
+        self.root = self.__allocate(1)
+        self.__players[self.root] = initial_state[0]
+
+    def __len__(self) -> int:
+        return self.__number_of_nodes
+
+    @staticmethod
+    def bytes_per_node() -> int:
+        return sum(np.dtype(dtype).itemsize for dtype in (np.int32, np.int32, np.int16, np.int16, np.int8, np.int32, np.int32))
+
+    def __allocate(self, number_of_nodes: int) -> int:
+        first = self.__number_of_nodes
+        self.__number_of_nodes += number_of_nodes
+        capacity = len(self.__parents)
+        if self.__number_of_nodes > capacity:
+            capacity = max(2 * capacity, self.__number_of_nodes)
+            self.__parents = self.__grow(self.__parents, capacity, -1)
+            self.__first_children = self.__grow(self.__first_children, capacity, -1)
+            self.__number_of_children = self.__grow(self.__number_of_children, capacity, 0)
+            self.__actions = self.__grow(self.__actions, capacity, 0)
+            self.__players = self.__grow(self.__players, capacity, 0)
+            self.__visits = self.__grow(self.__visits, capacity, 0)
+            self.__scores = self.__grow(self.__scores, capacity, 0)
+        return first
+
+    @staticmethod
+    def __grow(array: np.ndarray, capacity: int, fill_value: int) -> np.ndarray:
+        grown = np.full(capacity, fill_value, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def __expand(self, node: int, world: SimulatedWorld) -> None:
+        legal_actions = [action for action, legal in enumerate(world.get_legal_actions()) if legal]
+        first = self.__allocate(len(legal_actions))
+        children = slice(first, first + len(legal_actions))
+        self.__parents[children] = node
+        self.__actions[children] = legal_actions
+        self.__players[children] = ArrayMCTS.opposite_player[int(self.__players[node])]
+        self.__first_children[node] = first
+        self.__number_of_children[node] = len(legal_actions)
+
+    def __tree_policy(self, node: int) -> int:
+        """
+        Returns the index of the child with the best UCT value for the player to move in node.
+        """
+        first = self.__first_children[node]
+        children = slice(first, first + self.__number_of_children[node])
+        visits = self.__visits[children]
+        player = self.__players[node]
+        c = self.__uct_c if player == 1 else -self.__uct_c
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            uct = self.__scores[children] / visits + c * np.sqrt(2 * np.log(self.__visits[node]) / visits)
+        uct[visits == 0] = c * float('inf')
+        return int(first + (np.argmax(uct) if player == 1 else np.argmin(uct)))
+
+    def __select(self, world: SimulatedWorld) -> List[int]:
+        # Tree search
+        current_node = self.root
+        path = [current_node]
+        while self.__number_of_children[current_node] > 0:
+            current_node = self.__tree_policy(current_node)
+            world.step(int(self.__actions[current_node]))
+            path.append(current_node)
+
+        # Node expansion. Always expand the root
+        if not world.is_final_state() and (self.__visits[current_node] != 0 or current_node == self.root):
+            self.__expand(current_node, world)
+            current_node = int(self.__first_children[current_node])
+            world.step(int(self.__actions[current_node]))
+            path.append(current_node)
+        return path
+
+    def __backpropagate(self, path: List[int], winner: int) -> None:
+        self.__scores[path] += ArrayMCTS.player_reward[winner]
+        self.__visits[path] += 1
+
+    def do_one_simulation(self, default_policy: Policy, world: SimulatedWorld) -> None:
+        path = self.__select(world)
+
+        # Rollout
+        current_state = world.get_state()
+        while not world.is_final_state():
+            legal_actions = world.get_legal_actions()
+            action = default_policy(current_state, legal_actions)
+            current_state, _ = world.step(action)
+
+        self.__backpropagate(path, world.get_winner_id())
+
+    def do_batched_simulations(self, default_policy: BatchPolicy, worlds: List[SimulatedWorld]) -> None:
+        paths: List[List[int]] = []
+        for world in worlds:
+            path = self.__select(world)
+            self.__add_virtual_loss(path, 1)
+            paths.append(path)
+
+        # Rollout
+        states = [world.get_state() for world in worlds]
+        active = [i for i, world in enumerate(worlds) if not world.is_final_state()]
+        while active:
+            legal_actions = [worlds[i].get_legal_actions() for i in active]
+            actions = default_policy([states[i] for i in active], legal_actions)
+            for i, action in zip(active, actions):
+                states[i], _ = worlds[i].step(action)
+            active = [i for i in active if not worlds[i].is_final_state()]
+
+        for path, world in zip(paths, worlds):
+            self.__add_virtual_loss(path, -1)
+            self.__backpropagate(path, world.get_winner_id())
+
+    def __add_virtual_loss(self, path: List[int], sign: int) -> None:
+        """
+        Counts (sign 1) or uncounts (sign -1) a pending simulation as a loss for the players choosing the path.
+        """
+        self.__visits[path] += sign
+        for node in path[1:]:
+            choosing_player = int(self.__players[self.__parents[node]])
+            self.__scores[node] -= sign * ArrayMCTS.player_reward[choosing_player]
+
+    def get_child_visits(self) -> List[int]:
+        first = self.__first_children[self.root]
+        return self.__visits[first:first + self.__number_of_children[self.root]].tolist()
+
+    def get_normalized_distribution(self) -> Tuple[float, ...]:
+        distribution = np.zeros(self.action_space)
+        first = self.__first_children[self.root]
+        children = slice(first, first + self.__number_of_children[self.root])
+        visits = self.__visits[children]
+        distribution[self.__actions[children]] = visits / max(int(visits.sum()), 1)
+        return tuple(float(p) for p in distribution)
+
+    def choose_action(self) -> int:
+        if self.__choose_most_visited:
+            first = self.__first_children[self.root]
+            return int(self.__actions[first + np.argmax(self.__visits[first:first + self.__number_of_children[self.root]])])
+        return int(self.__actions[self.__tree_policy(self.root)])
+
+    def update_root(self, action: int) -> None:
+        first = self.__first_children[self.root]
+        for child in range(first, first + self.__number_of_children[self.root]):
+            if self.__actions[child] == action:
+                self.reuse_statistics.append((int(self.__visits[child]), int(self.__visits[self.root])))
+                self.__compact(child)
+                return
+        raise KeyError(action)
+
+    def __compact(self, new_root: int) -> None:
+        """
+        Keeps only the subtree of new_root, copied in breadth-first order so child blocks stay contiguous.
+        """
+        order = [new_root]
+        i = 0
+        while i < len(order):
+            node = order[i]
+            number_of_children = self.__number_of_children[node]
+            if number_of_children > 0:
+                first = self.__first_children[node]
+                order.extend(range(first, first + number_of_children))
+            i += 1
+
+        kept = np.array(order, dtype=np.int64)
+        new_indices = np.full(self.__number_of_nodes, -1, dtype=np.int32)
+        new_indices[kept] = np.arange(len(kept), dtype=np.int32)
+
+        capacity = max(len(self.__parents) // 2, 2 * len(kept), 1024)
+        parents = self.__parents[kept]
+        first_children = self.__first_children[kept]
+        self.__parents = self.__grow(np.where(parents >= 0, new_indices[parents], -1).astype(np.int32), capacity, -1)
+        self.__parents[0] = -1
+        self.__first_children = self.__grow(np.where(first_children >= 0, new_indices[first_children], -1).astype(np.int32), capacity, -1)
+        self.__number_of_children = self.__grow(self.__number_of_children[kept], capacity, 0)
+        self.__actions = self.__grow(self.__actions[kept], capacity, 0)
+        self.__players = self.__grow(self.__players[kept], capacity, 0)
+        self.__visits = self.__grow(self.__visits[kept], capacity, 0)
+        self.__scores = self.__grow(self.__scores[kept], capacity, 0)
+        self.__number_of_nodes = len(kept)
+        self.root = 0
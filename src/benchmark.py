@@ -0,0 +1,223 @@
+import argparse
+import random
+import tracemalloc
+from time import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+import parameters
+from array_mcts import ArrayMCTS
+from config import Config
+from game import Game
+from MCTS import MCTS
+from numpy_anet import NumpyANET
+from perfect_play import PerfectPlayTable
+from world.batch_hex import BatchHex
+from world.bitboard_hex import BitboardHex
+from world.hex import Hex
+from world.simulated_world_factory import SimulatedWorldFactory
+from world.zobrist import Zobrist
+
+
+def random_policy(state: Tuple[int, ...], legal_actions: Tuple[int, ...]) -> int:
+    return random.choice([action for action, legal in enumerate(legal_actions) if legal])
+
+
+def zobrist_collisions(number_of_positions: int) -> None:
+    """
+    Hashes random Hex positions and counts distinct positions sharing a hash.
+    """
+    length = parameters.SIZE ** 2
+    boards: Dict[int, bytes] = {}
+    distinct_positions = 0
+    collisions = 0
+    for _ in range(number_of_positions):
+        number_of_pegs = random.randint(0, length)
+        board = [0] * length
+        for index, cell in enumerate(random.sample(range(length), number_of_pegs)):
+            board[cell] = 1 if index % 2 == 0 else 2
+        state = (1 if number_of_pegs % 2 == 0 else 2, *board)
+
+        state_hash = Zobrist.hash_state(state)
+        packed_state = bytes(state)
+        if state_hash not in boards:
+            boards[state_hash] = packed_state
+            distinct_positions += 1
+        elif boards[state_hash] != packed_state:
+            collisions += 1
+
+    print(f'Zobrist: {distinct_positions} distinct positions, {collisions} collisions '
+          f'({collisions / max(distinct_positions, 1):.2e} per position)')
+
+
+def bitboard_equivalence(number_of_games: int, max_size: int) -> None:
+    """
+    Plays the same random games on Hex and BitboardHex for every board size from 2 to max_size,
+    and counts the moves after which their states, legal actions, hashes or winners differ.
+    Every game is also replayed from a reset to one of its positions.
+    """
+    for size in range(2, max_size + 1):
+        config = Config(SIZE=size, GAME_TYPE=Game.Hex)
+        moves = 0
+        mismatches = 0
+        for _ in range(number_of_games):
+            hex_world, bitboard_world = Hex(config=config), BitboardHex(config=config)
+            positions = [hex_world.get_state()]
+            for replay in range(2):
+                while not hex_world.is_final_state():
+                    legal_actions = hex_world.get_legal_actions()
+                    action = random_policy(positions[-1], legal_actions)
+                    hex_step, bitboard_step = hex_world.step(action), bitboard_world.step(action)
+                    positions.append(hex_step[0])
+                    moves += 1
+                    mismatches += (
+                        hex_step != bitboard_step
+                        or hex_world.get_legal_actions() != bitboard_world.get_legal_actions()
+                        or hex_world.get_state_hash() != bitboard_world.get_state_hash()
+                        or hex_world.is_final_state() != bitboard_world.is_final_state()
+                        or hex_world.get_winner_id() != bitboard_world.get_winner_id()
+                    )
+                if replay == 0:
+                    position = random.choice(positions[:-1])
+                    positions = [hex_world.reset(position)]
+                    mismatches += bitboard_world.reset(position) != positions[0]
+
+        print(f'{size}x{size}: {mismatches} mismatches between Hex and BitboardHex in {moves} moves')
+
+
+def tree_storage(number_of_simulations: int) -> None:
+    """
+    Compares TreeNode and array-backed trees in nodes per GB and simulations per second, with a random default policy.
+    """
+    initial_state = SimulatedWorldFactory.get_simulated_world().reset()
+    for tree_type in (MCTS, ArrayMCTS):
+        tracemalloc.start()
+        monte_carlo_tree = tree_type(initial_state)
+        monte_carlo_game = SimulatedWorldFactory.get_simulated_world(initial_state)
+        start_time = time()
+        for _ in range(number_of_simulations):
+            monte_carlo_tree.do_one_simulation(random_policy, monte_carlo_game)
+            monte_carlo_game.reset(initial_state)
+        seconds = time() - start_time
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if isinstance(monte_carlo_tree, ArrayMCTS):
+            number_of_nodes = len(monte_carlo_tree)
+        else:
+            number_of_nodes, stack = 0, [monte_carlo_tree.root]
+            while stack:
+                node = stack.pop()
+                number_of_nodes += 1
+                stack.extend(node.children.values())
+
+        print(f'{tree_type.__name__}: {number_of_nodes} nodes, {2 ** 30 * number_of_nodes / memory:,.0f} nodes/GB, '
+              f'{number_of_simulations / seconds:.0f} simulations/s')
+
+
+def perfect_play_accuracy(table_filename: str, model_filename: str, number_of_games: int) -> None:
+    """
+    Plays random games and counts how often ANET's greedy move keeps a win that the player to move has under perfect play.
+    """
+    from ANET import ANET  # Keeps TensorFlow out of the other benchmarks
+
+    table = PerfectPlayTable.load(table_filename)
+    anet = ANET()
+    anet.load(model_filename)
+    winning_positions = 0
+    correct_actions = 0
+    for _ in range(number_of_games):
+        world = SimulatedWorldFactory.get_simulated_world()
+        state = world.get_state()
+        while not world.is_final_state():
+            legal_actions = world.get_legal_actions()
+            winning_actions = table.get_winning_actions(world)
+            if winning_actions:
+                winning_positions += 1
+                correct_actions += anet.choose_greedy(state, legal_actions) in winning_actions
+            state, _ = world.step(random_policy(state, legal_actions))
+
+    print(f'{model_filename}: kept the win in {correct_actions}/{winning_positions} positions '
+          f'({correct_actions / max(winning_positions, 1):.1%})')
+
+
+def inference_latency(model_filename: str, number_of_calls: int) -> None:
+    """
+    Compares the per-call latency of single-state predictions with Keras and with NumpyANET.
+    """
+    from keras.models import load_model  # Keeps TensorFlow out of the other benchmarks
+
+    model = load_model(model_filename, compile=False)
+    numpy_anet = NumpyANET(model_filename)
+    world = SimulatedWorldFactory.get_simulated_world()
+    states = []
+    while len(states) < 100:
+        state = world.reset() if world.is_final_state() else world.get_state()
+        states.append(state)
+        world.step(random_policy(state, world.get_legal_actions()))
+    batch = np.array(states, dtype=np.float32)
+    print(f'Largest difference between outputs: {np.abs(model.predict(batch) - numpy_anet.predict(states)).max():.2e}')
+
+    predictors = {
+        'model.predict': lambda x: model.predict(x),
+        'model(x)': lambda x: model(x, training=False),
+        'NumpyANET.predict': numpy_anet.predict,
+    }
+    for name, predict in predictors.items():
+        start_time = time()
+        for i in range(number_of_calls):
+            predict(batch[i % len(batch)][None])
+        print(f'{name}: {1e6 * (time() - start_time) / number_of_calls:.1f} µs per call')
+
+
+def batch_simulation(number_of_games: int, batch_size: int) -> None:
+    """
+    Compares random games per second played on BatchHex with looping over worlds from SimulatedWorldFactory.
+    """
+    rng = np.random.default_rng()
+    start_time = time()
+    for _ in range(number_of_games // batch_size):
+        batch_world = BatchHex(batch_size)
+        while not batch_world.is_final_state().all():
+            # Uniformly random legal actions: the legal cell with the largest random key
+            legal_actions = batch_world.get_legal_actions()
+            batch_world.step(np.argmax(rng.random(legal_actions.shape) * legal_actions, axis=1))
+    batch_games_per_second = batch_size * (number_of_games // batch_size) / (time() - start_time)
+
+    start_time = time()
+    for _ in range(number_of_games // batch_size):
+        worlds = [SimulatedWorldFactory.get_simulated_world() for _ in range(batch_size)]
+        for world in worlds:
+            state = world.get_state()
+            while not world.is_final_state():
+                state, _ = world.step(random_policy(state, world.get_legal_actions()))
+    world_games_per_second = batch_size * (number_of_games // batch_size) / (time() - start_time)
+
+    print(f'BatchHex ({batch_size} boards): {batch_games_per_second:.0f} games/s')
+    print(f'{type(SimulatedWorldFactory.get_simulated_world()).__name__} loop: {world_games_per_second:.0f} games/s '
+          f'({batch_games_per_second / world_games_per_second:.1f}x)')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmark', choices=['zobrist', 'bitboard-hex', 'tree', 'perfect-play', 'inference', 'batch-hex'])
+    parser.add_argument('-n', type=int, help='Number of positions, simulations, games or calls')
+    parser.add_argument('--table', help='Perfect play table written by perfect_play.py')
+    parser.add_argument('--model', help='ANET weights (.h5)')
+    parser.add_argument('--batch-size', type=int, default=256, help='Boards per BatchHex')
+    parser.add_argument('--max-size', type=int, default=10, help='Largest board compared by bitboard-hex')
+    arguments = parser.parse_args()
+
+    if arguments.benchmark == 'zobrist':
+        zobrist_collisions(arguments.n or 1_000_000)
+    elif arguments.benchmark == 'bitboard-hex':
+        bitboard_equivalence(arguments.n or 1000, arguments.max_size)
+    elif arguments.benchmark == 'tree':
+        tree_storage(arguments.n or 10_000)
+    elif arguments.benchmark == 'perfect-play':
+        perfect_play_accuracy(arguments.table, arguments.model, arguments.n or 100)
+    elif arguments.benchmark == 'inference':
+        inference_latency(arguments.model, arguments.n or 1000)
+    elif arguments.benchmark == 'batch-hex':
+        batch_simulation(arguments.n or 4096, arguments.batch_size)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+from importlib import import_module
+from typing import Any, Dict, List, Optional
+
+import parameters
+from game import Game
+
+
+class Config:
+    """
+    Runtime parameters
+
+    ...
+
+    Holds every upper-case parameter of parameters.py as an attribute of the same name, with overrides applied,
+    so one process can hold several configurations at once. The board dimensions (STATE_SIZE, NUMBER_OF_ACTIONS,
+    the ends of ANET_DIMENSIONS and SIZE for Ledge) are always derived again from GAME_TYPE, SIZE and LEDGE_BOARD.
+    The Keras parameters are resolved lazily, as in parameters.py, and can be overridden by name, e.g. ANET_OPTIMIZER='SGD'.
+
+    Methods
+    -------
+    get_default() -> Config:
+        The configuration of parameters.py, shared by everything not given a config.
+    from_arguments(arguments: List[str]) -> Config:
+        Reads a --config file and --set NAME=VALUE overrides.
+    load(filename: str) -> Config:
+        Reads a configuration saved with save.
+    apply_to_parameters() -> None:
+        Sets the module-level parameters to the configuration, for modules reading parameters.py, like ANET.
+    save(filename: str) -> None:
+        Writes the configuration as JSON, e.g. next to the models it trained.
+    to_dict() -> Dict[str, Any]:
+        The parameters as JSON-compatible values.
+    """
+
+    __default: Optional[Config] = None
+
+    def __init__(self, **overrides: Any) -> None:
+        names = Config.get_names()
+        unknown_names = set(overrides) - set(names) - set(parameters.KERAS_PARAMETERS)
+        if unknown_names:
+            raise ValueError(f'Unknown parameters: {", ".join(sorted(unknown_names))}')
+
+        for name in names:
+            setattr(self, name, overrides.get(name, getattr(parameters, name)))
+
+        # A Keras parameter is overridden by the name of an attribute of its module, a dotted path or the object itself
+        self.KERAS_PARAMETERS = dict(self.KERAS_PARAMETERS)
+        for name in set(overrides) & set(self.KERAS_PARAMETERS):
+            value = overrides[name]
+            if isinstance(value, str):
+                module, _, attribute = value.rpartition('.')
+                self.KERAS_PARAMETERS[name] = (module or self.KERAS_PARAMETERS[name][0], attribute)
+            else:
+                self.KERAS_PARAMETERS[name] = (value.__module__, value.__name__)
+                setattr(self, name, value)
+
+        # Board dimensions follow the game
+        if self.GAME_TYPE == Game.Ledge:
+            self.SIZE = len(self.LEDGE_BOARD)
+        self.STATE_SIZE = 1 + (self.SIZE ** 2 if self.GAME_TYPE == Game.Hex else self.SIZE)
+        self.NUMBER_OF_ACTIONS = self.SIZE ** 2 if self.GAME_TYPE == Game.Hex else (self.SIZE ** 2 - self.SIZE) // 2 + 1
+        self.ANET_DIMENSIONS = (self.STATE_SIZE, *self.ANET_DIMENSIONS[1:-1], self.NUMBER_OF_ACTIONS)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for missing attributes, i.e. the Keras parameters before their first use
+        keras_parameters = self.__dict__.get('KERAS_PARAMETERS', {})
+        if name not in keras_parameters:
+            raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
+        module, attribute = keras_parameters[name]
+        value = getattr(import_module(module), attribute)
+        setattr(self, name, value)
+        return value
+
+    @staticmethod
+    def get_names() -> List[str]:
+        return [name for name in vars(parameters) if name.isupper() and name not in parameters.KERAS_PARAMETERS]
+
+    @staticmethod
+    def get_default() -> Config:
+        if Config.__default is None:
+            Config.__default = Config()
+        return Config.__default
+
+    def apply_to_parameters(self) -> None:
+        """
+        Sets the module-level parameters to the configuration, and makes it the default one.
+        ANET reads parameters.py when it is imported, so this is called in every process before ANET is imported.
+        """
+        vars(parameters).update(vars(self))
+        Config.__default = self
+
+    def to_dict(self) -> Dict[str, Any]:
+        values = {}
+        for name in Config.get_names():
+            value = getattr(self, name)
+            values[name] = value.name if isinstance(value, Game) else value
+        return values
+
+    @staticmethod
+    def from_dict(values: Dict[str, Any]) -> Config:
+        overrides = {}
+        for name, value in values.items():
+            default = vars(parameters).get(name)  # Unlike getattr, never imports Keras for the Keras parameters
+            if isinstance(default, Game):
+                value = Game[value]
+            elif isinstance(default, tuple):
+                value = tuple(value)
+            elif isinstance(default, dict):
+                value = {key: tuple(item) if isinstance(item, list) else item for key, item in value.items()}
+            overrides[name] = value
+        return Config(**overrides)
+
+    def save(self, filename: str) -> None:
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(filename, 'w') as config_file:
+            json.dump(self.to_dict(), config_file, indent=4)
+
+    @staticmethod
+    def load(filename: str) -> Config:
+        with open(filename) as config_file:
+            return Config.from_dict(json.load(config_file))
+
+    @staticmethod
+    def from_arguments(arguments: List[str]) -> Config:
+        parser = argparse.ArgumentParser()
+        parser.add_argument('--config', help='JSON file saved by Config.save')
+        parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help='Overrides one parameter')
+        parsed_arguments = parser.parse_args(arguments)
+
+        values = {}
+        if parsed_arguments.config is not None:
+            with open(parsed_arguments.config) as config_file:
+                values = json.load(config_file)
+        for assignment in parsed_arguments.set:
+            name, value = assignment.split('=', 1)
+            try:
+                values[name] = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                values[name] = value  # Plain strings, e.g. GAME_TYPE=Hex
+        return Config.from_dict(values)
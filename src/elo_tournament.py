@@ -0,0 +1,126 @@
+import argparse
+import os
+from collections import defaultdict
+from itertools import combinations
+from math import isqrt
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from game import Game
+from numpy_anet import NumpyANET
+from pairing_results import PairingResults, hash_model_file
+from TOPP import play_pairings
+
+MODEL_DIRECTORIES = ('models', 'model', '')  # Where the runs of the hall of fame keep their cached ANETs
+
+
+def find_models(hall_of_fame_directory: str) -> Dict[str, str]:
+    """
+    Returns the cached ANETs of every run in the hall of fame, as model filenames by '<run>/Agent-e<episode>'.
+    """
+    models = {}
+    for run in sorted(os.listdir(hall_of_fame_directory)):
+        for model_directory in MODEL_DIRECTORIES:
+            directory = os.path.join(hall_of_fame_directory, run, model_directory)
+            if not os.path.isdir(directory):
+                continue
+            episodes = sorted(int(filename[:-3]) for filename in os.listdir(directory) if filename.endswith('.h5') and filename[:-3].isdigit())
+            for episode in episodes:
+                models[f'{run}/Agent-e{episode}'] = os.path.join(directory, f'{episode}.h5')
+            if episodes:
+                break
+    return models
+
+
+def fit_bradley_terry(number_of_models: int, wins: np.ndarray, iterations: int = 10_000, tolerance: float = 1e-9) -> np.ndarray:
+    """
+    Fits Bradley-Terry strengths to a matrix of wins[i, j] of model i over model j with the MM algorithm,
+    and returns them as Elo ratings averaging 1500. Every model also gets one virtual win and one virtual loss
+    against a model of strength 1, which keeps the strengths of models that never or always win finite.
+    """
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1) + 1
+    strengths = np.ones(number_of_models)
+    for _ in range(iterations):
+        expected_games = (games / (strengths[:, None] + strengths[None, :])).sum(axis=1) + 2 / (strengths + 1)
+        new_strengths = total_wins / expected_games
+        converged = np.abs(new_strengths - strengths).max() < tolerance
+        strengths = new_strengths
+        if converged:
+            break
+    # The virtual opponent fixes the scale during the fit, so the ratings are only centered once it has converged
+    ratings = 400 * np.log10(strengths)
+    return 1500 + ratings - ratings.mean()
+
+
+def get_config(dimensions: Tuple[int, int], config: Config) -> Optional[Config]:
+    """
+    The configuration of the game a group of models with the given input and output sizes plays, or None if no game matches.
+    Hex boards follow from the sizes, while a Ledge board cannot be recovered from them, so Ledge models must match the configured board.
+    """
+    if config.GAME_TYPE == Game.Ledge and dimensions == (config.STATE_SIZE, config.NUMBER_OF_ACTIONS):
+        return config
+    size = isqrt(dimensions[1])
+    if size ** 2 == dimensions[1] and dimensions[0] == 1 + size ** 2:
+        return Config.from_dict({**config.to_dict(), 'GAME_TYPE': Game.Hex.name, 'SIZE': size})
+    return None
+
+
+def run_elo_tournament(hall_of_fame_directory: str, results_filename: str, number_of_games: int, number_of_workers: int) -> Dict[str, float]:
+    """
+    Plays the pairings of hall of fame models missing from the results store and rates every model.
+    Models only play models with the same input and output sizes, and each such group is rated separately.
+    Groups whose sizes match no game are skipped, and models with identical files share one rating.
+    """
+    models = find_models(hall_of_fame_directory)
+    model_hashes = {name: hash_model_file(filename) for name, filename in models.items()}
+    groups: Dict[Tuple[int, int], List[str]] = defaultdict(list)  # Model names by (inputs, outputs)
+    for name, filename in models.items():
+        dimensions = NumpyANET(filename).get_dimensions()
+        groups[dimensions[0], dimensions[-1]].append(name)
+
+    stored_results = PairingResults(results_filename, number_of_games)
+    ratings = {}
+    for dimensions, names in groups.items():
+        config = get_config(dimensions, Config.get_default())
+        if config is None:
+            print(f'Skipping {len(names)} models with {dimensions[0]} inputs and {dimensions[1]} outputs: no game matches their sizes')
+            continue
+        # Identical models, e.g. shared between runs, are played and rated once
+        filenames_by_hash: Dict[str, str] = {}
+        for name in names:
+            filenames_by_hash.setdefault(model_hashes[name], models[name])
+        hashes = list(filenames_by_hash)
+        hashes_by_filename = {filename: model_hash for model_hash, filename in filenames_by_hash.items()}
+        pairings = [
+            (filenames_by_hash[hash_1], filenames_by_hash[hash_2])
+            for hash_1, hash_2 in combinations(hashes, 2) if stored_results.get(hash_1, hash_2) is None
+        ]
+        print(f'{len(hashes)} distinct models with {dimensions[0]} inputs and {dimensions[1]} outputs: playing {len(pairings)} new pairings')
+        for filename_1, filename_2, wins_1, wins_2 in play_pairings(pairings, number_of_games, number_of_workers, config):
+            stored_results.add(hashes_by_filename[filename_1], hashes_by_filename[filename_2], wins_1, wins_2)
+        stored_results.save()  # After every group, so an interrupted tournament keeps its games
+
+        wins = np.zeros((len(hashes), len(hashes)))
+        for i, j in combinations(range(len(hashes)), 2):
+            wins[i, j], wins[j, i] = stored_results.get(hashes[i], hashes[j])
+        hash_ratings = dict(zip(hashes, fit_bradley_terry(len(hashes), wins)))
+        ratings.update((name, hash_ratings[model_hashes[name]]) for name in names)
+    return ratings
+
+
+if __name__ == "__main__":
+    # python elo_tournament.py ../hall_of_fame --results ../hall_of_fame/elo_results.json
+    default_config = Config.get_default()
+    parser = argparse.ArgumentParser(description='Rates the ANETs of every hall of fame run, only playing pairings not played before')
+    parser.add_argument('hall_of_fame', nargs='?', default='../hall_of_fame', help='Directory of the runs')
+    parser.add_argument('--results', default='../hall_of_fame/elo_results.json', help='Pairing results kept between tournaments')
+    parser.add_argument('--games', type=int, default=default_config.NUMBER_OF_GAMES, help='Games per new pairing')
+    parser.add_argument('--workers', type=int, default=default_config.TOPP_WORKERS)
+    arguments = parser.parse_args()
+
+    model_ratings = run_elo_tournament(arguments.hall_of_fame, arguments.results, arguments.games, arguments.workers)
+    for rank, (name, rating) in enumerate(sorted(model_ratings.items(), key=lambda item: -item[1]), start=1):
+        print(f'{rank:>4}  {rating:7.1f}  {name}')
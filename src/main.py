@@ -1,9 +1,8 @@
 import glob
 import os
+import sys
 
-import parameters
-from reinforcement_learner import ReinforcementLearner
-from TOPP import TOPP
+from config import Config
 
 
 def clear_models():
@@ -13,10 +12,18 @@ def clear_models():
 
 
 if __name__ == "__main__":
-    if parameters.RUN_TRAINING:
+    config = Config.from_arguments(sys.argv[1:])
+    config.apply_to_parameters()
+
+    # Imported here, since spawned workers import this module as __mp_main__ and should not load TensorFlow,
+    # and since ANET reads the parameters when imported, so the overrides must be applied first
+    from reinforcement_learner import ReinforcementLearner
+    from TOPP import TOPP
+
+    if config.RUN_TRAINING:
         clear_models()
-        rl_learner = ReinforcementLearner()
+        rl_learner = ReinforcementLearner(config)
         rl_learner.run()
 
-    topp = TOPP()
+    topp = TOPP(config)
     topp.run()
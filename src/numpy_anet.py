@@ -0,0 +1,195 @@
+import json
+import os
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import h5py
+import numpy as np
+
+import parameters
+from prediction_cache import PredictionCache
+from world.hex_symmetry import HexSymmetry
+
+MODEL_DIRECTORY = 'models'  # Where ANET.save(filename) writes and ANET.load(filename) reads weights
+
+
+def model_path(filename: str) -> str:
+    """
+    Path of the weights file written by ANET.save(filename), for readers other than ANET.load.
+    """
+    return os.path.join(MODEL_DIRECTORY, filename)
+
+
+def _linear(x: np.ndarray) -> None:
+    pass
+
+
+def _relu(x: np.ndarray) -> None:
+    np.maximum(x, 0, out=x)
+
+
+def _sigmoid(x: np.ndarray) -> None:
+    np.negative(x, out=x)
+    np.exp(x, out=x)
+    x += 1
+    np.reciprocal(x, out=x)
+
+
+def _tanh(x: np.ndarray) -> None:
+    np.tanh(x, out=x)
+
+
+def _softmax(x: np.ndarray) -> None:
+    x -= x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+
+
+class NumpyANET:
+    """
+    Inference-only ANET running the forward pass in NumPy
+
+    ...
+
+    Reads the dense layers and their activation functions from a Keras .h5 file saved by ANET,
+    and evaluates them in float32 with one preallocated buffer per layer and batch size.
+    For the small ANET this avoids the per-call overhead of TensorFlow. Keras is still used for training.
+    With a cache size, output distributions are kept in an LRU prediction cache that is cleared on every load,
+    i.e. whenever the trained ANET's weights are exported after a fit. A symmetric cache stores Hex positions
+    under their canonical state, so a position and its rotation share one entry.
+
+    Methods
+    -------
+    load(filename: str) -> None:
+        Loads the weights of a saved ANET.
+    get_dimensions() -> Tuple[int, ...]:
+        Layer sizes from input to output, as in ANET_DIMENSIONS.
+    predict(states: Sequence[Tuple[int, ...]]) -> np.ndarray:
+        Output distributions of a batch of states, written to a reused buffer.
+    get_distribution(state, legal_actions) -> np.ndarray:
+        Output distribution over the legal actions, normalized.
+    choose_greedy(state, legal_actions) -> int:
+        The legal action with the highest probability.
+    choose_greedy_batch(states, legal_actions) -> np.ndarray:
+        choose_greedy for a batch of states with one forward pass.
+    choose_epsilon_greedy(state, legal_actions) -> int:
+        A random legal action with probability epsilon, else the greedy one.
+    choose_epsilon_greedy_batch(states, legal_actions) -> List[int]:
+        choose_epsilon_greedy for a batch of states with one forward pass.
+    """
+
+    activation_functions: Dict[str, Callable[[np.ndarray], None]] = {
+        'linear': _linear,
+        'relu': _relu,
+        'sigmoid': _sigmoid,
+        'tanh': _tanh,
+        'softmax': _softmax,
+    }
+
+    def __init__(
+        self,
+        filename: Optional[str] = None,
+        epsilon: float = parameters.ANET_EPSILON,
+        cache_size: int = 0,
+        symmetric_cache: bool = False,
+    ) -> None:
+        self.epsilon = epsilon
+        self.__layers: List[Tuple[np.ndarray, np.ndarray, Callable[[np.ndarray], None]]] = []
+        self.__buffers: Dict[int, List[np.ndarray]] = {}
+        self.prediction_cache: Optional[PredictionCache] = PredictionCache(cache_size) if cache_size > 0 else None
+        self.__symmetric_cache = symmetric_cache
+        if filename is not None:
+            self.load(filename)
+
+    def load(self, filename: str) -> None:
+        with h5py.File(filename, 'r') as model_file:
+            model_config = json.loads(model_file.attrs['model_config'])
+            weights = model_file['model_weights']
+            layers = []
+            for layer in model_config['config']['layers']:
+                if layer['class_name'] != 'Dense':
+                    continue
+                config = layer['config']
+                name = config['name']
+                kernel = np.asarray(weights[name][name]['kernel:0'], dtype=np.float32)
+                bias = np.asarray(weights[name][name]['bias:0'], dtype=np.float32)
+                layers.append((kernel, bias, NumpyANET.activation_functions[config['activation']]))
+        self.__layers = layers
+        self.__buffers = {}
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()  # Cached distributions belong to the previous weights
+
+    def get_dimensions(self) -> Tuple[int, ...]:
+        return (self.__layers[0][0].shape[0], *(len(bias) for _, bias, _ in self.__layers))
+
+    def __get_buffers(self, batch_size: int) -> List[np.ndarray]:
+        if batch_size not in self.__buffers:
+            self.__buffers[batch_size] = [
+                np.empty((batch_size, self.__layers[0][0].shape[0]), dtype=np.float32),
+                *(np.empty((batch_size, len(bias)), dtype=np.float32) for _, bias, _ in self.__layers),
+            ]
+        return self.__buffers[batch_size]
+
+    def predict(self, states: Sequence[Tuple[int, ...]]) -> np.ndarray:
+        """
+        The returned array is overwritten by the next call with the same batch size.
+        """
+        buffers = self.__get_buffers(len(states))
+        buffers[0][:] = states
+        for (kernel, bias, activation_function), x, output in zip(self.__layers, buffers, buffers[1:]):
+            np.dot(x, kernel, out=output)
+            output += bias
+            activation_function(output)
+        return buffers[-1]
+
+    def __predict_cached(self, states: Sequence[Tuple[int, ...]]) -> Sequence[np.ndarray]:
+        """
+        Output distributions of a batch of states, predicting only the states missing from the cache.
+        """
+        if self.prediction_cache is None:
+            return self.predict(states)
+        rotations = [False] * len(states)
+        if self.__symmetric_cache:
+            states, rotations = zip(*(HexSymmetry.canonicalize(state) for state in states))
+        keys = [PredictionCache.get_key(state) for state in states]
+        distributions = [self.prediction_cache.get(key) for key in keys]
+        missing = [index for index, distribution in enumerate(distributions) if distribution is None]
+        if missing:
+            predictions = self.predict([states[index] for index in missing])
+            for index, prediction in zip(missing, predictions):
+                distributions[index] = prediction.copy()  # The prediction buffer is reused by the next call
+                self.prediction_cache.put(keys[index], distributions[index])
+        return [distribution[::-1] if rotated else distribution for distribution, rotated in zip(distributions, rotations)]
+
+    @staticmethod
+    def __mask(distribution: np.ndarray, legal_actions: Tuple[int, ...]) -> np.ndarray:
+        masked_distribution = distribution * np.asarray(legal_actions, dtype=np.float32)
+        total = masked_distribution.sum()
+        if total > 0:
+            return masked_distribution / total
+        return np.asarray(legal_actions, dtype=np.float32) / sum(legal_actions)
+
+    def get_distribution(self, state: Tuple[int, ...], legal_actions: Tuple[int, ...]) -> np.ndarray:
+        return NumpyANET.__mask(self.__predict_cached([state])[0], legal_actions)
+
+    def choose_greedy(self, state: Tuple[int, ...], legal_actions: Tuple[int, ...]) -> int:
+        return int(np.argmax(self.get_distribution(state, legal_actions)))
+
+    def choose_greedy_batch(self, states: Sequence[Tuple[int, ...]], legal_actions: np.ndarray) -> np.ndarray:
+        distributions = np.asarray(self.__predict_cached(states))
+        return np.argmax(np.where(np.asarray(legal_actions) != 0, distributions, -np.inf), axis=1)
+
+    def __choose_random(self, legal_actions: Tuple[int, ...]) -> int:
+        return random.choice([action for action, legal in enumerate(legal_actions) if legal])
+
+    def choose_epsilon_greedy(self, state: Tuple[int, ...], legal_actions: Tuple[int, ...]) -> int:
+        if random.random() < self.epsilon:
+            return self.__choose_random(legal_actions)
+        return self.choose_greedy(state, legal_actions)
+
+    def choose_epsilon_greedy_batch(self, states: List[Tuple[int, ...]], legal_actions: List[Tuple[int, ...]]) -> List[int]:
+        distributions = self.__predict_cached(states)
+        return [
+            self.__choose_random(legal) if random.random() < self.epsilon else int(np.argmax(NumpyANET.__mask(distribution, legal)))
+            for distribution, legal in zip(distributions, legal_actions)
+        ]
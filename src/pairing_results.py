@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+
+def hash_model_file(filename: str) -> str:
+    """
+    SHA-1 of a model file's contents, so results follow a model when its file is copied or renamed.
+    """
+    file_hash = hashlib.sha1()
+    with open(filename, 'rb') as model_file:
+        for block in iter(lambda: model_file.read(1 << 20), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+class PairingResults:
+    """
+    Persistent store of tournament results between pairs of models
+
+    ...
+
+    Results are keyed by the content hashes of both model files, in sorted order, and by the number of games
+    per pairing, and hold the wins of each model over all games played between them. Tournaments look pairings up
+    before playing them, so adding a model only plays its new pairings, while changing the number of games plays
+    every pairing again. The store is a JSON file, replaced atomically on save.
+
+    Methods
+    -------
+    get(model_hash_1: str, model_hash_2: str) -> Optional[Tuple[int, int]]:
+        Wins of each model, or None for pairings never played.
+    add(model_hash_1: str, model_hash_2: str, wins_1: int, wins_2: int) -> None:
+        Adds the wins of games played between two models.
+    get_all() -> List[Tuple[str, str, int, int]]:
+        Every pairing stored for this number of games as (model hash 1, model hash 2, wins 1, wins 2).
+    save() -> None:
+        Writes the store to its file.
+    """
+
+    def __init__(self, filename: str, number_of_games: int) -> None:
+        self.__filename = filename
+        self.__number_of_games = number_of_games
+        self.__results: Dict[str, List[int]] = {}
+        if os.path.exists(filename):
+            with open(filename) as results_file:
+                self.__results = json.load(results_file)
+
+    def __len__(self) -> int:
+        return len(self.__results)
+
+    def __get_key(self, model_hash_1: str, model_hash_2: str) -> Tuple[str, bool]:
+        """
+        Returns the key of a pairing, and whether the models are swapped in it.
+        """
+        if model_hash_1 <= model_hash_2:
+            return f'{model_hash_1}:{model_hash_2}:{self.__number_of_games}', False
+        return f'{model_hash_2}:{model_hash_1}:{self.__number_of_games}', True
+
+    def get(self, model_hash_1: str, model_hash_2: str) -> Optional[Tuple[int, int]]:
+        key, swapped = self.__get_key(model_hash_1, model_hash_2)
+        if key not in self.__results:
+            return None
+        wins_1, wins_2 = self.__results[key]
+        return (wins_2, wins_1) if swapped else (wins_1, wins_2)
+
+    def add(self, model_hash_1: str, model_hash_2: str, wins_1: int, wins_2: int) -> None:
+        key, swapped = self.__get_key(model_hash_1, model_hash_2)
+        if swapped:
+            wins_1, wins_2 = wins_2, wins_1
+        previous_wins_1, previous_wins_2 = self.__results.get(key, (0, 0))
+        self.__results[key] = [previous_wins_1 + wins_1, previous_wins_2 + wins_2]
+
+    def get_all(self) -> List[Tuple[str, str, int, int]]:
+        pairings = []
+        for key, (wins_1, wins_2) in self.__results.items():
+            model_hash_1, model_hash_2, number_of_games = key.split(':')
+            if int(number_of_games) == self.__number_of_games:
+                pairings.append((model_hash_1, model_hash_2, wins_1, wins_2))
+        return pairings
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.__filename) or '.', exist_ok=True)
+        temporary_filename = f'{self.__filename}.{os.getpid()}'
+        with open(temporary_filename, 'w') as results_file:
+            json.dump(self.__results, results_file)
+        os.replace(temporary_filename, self.__filename)
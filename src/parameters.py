@@ -1,6 +1,5 @@
-from keras.activations import linear, relu, sigmoid, tanh  # noqa
-from keras.losses import kl_divergence, mse  # noqa
-from keras.optimizers import SGD, Adagrad, Adam, RMSprop  # noqa
+from importlib import import_module
+from typing import Any
 
 from game import Game
 
@@ -11,11 +10,29 @@ RUN_TRAINING = False
 # RL parameters
 EPISODES = 120
 REPLAY_BUFFER_SIZE = 512
+REPLAY_BUFFER_DIRECTORY = None  # Directory of a memory-mapped replay buffer kept across runs, None keeps it in memory
+SELF_PLAY_ACTORS = 0  # Processes playing self-play episodes for the learner, 0 plays them sequentially
+WEIGHT_PUBLISHING_INTERVAL = 1  # Episodes trained on between each weight update sent to the actors
+SELF_PLAY_WEIGHTS = 'self_play_actors.h5'  # ANET weights loaded by the self-play actors
+CONFIG_FILE = 'models/config.json'  # Where the learner saves the parameters it ran with, next to the cached ANETs
 
 # MCTS parameters
 MIN_NUMBER_OF_ROLLOUTS = 100
 SIMULATION_TIME_OUT = 0.0  # s
+ANYTIME_SEARCH = False  # Scales the rollouts and time per move by game phase and stops once the most visited move, which is then played, is settled
+ANYTIME_PHASE_EXPONENT = 0.5  # Budget of a move is (legal actions / NUMBER_OF_ACTIONS) ** exponent of the full budget
 UCT_C = 1  # "theoretically 1"
+PUCT = False  # Weights the exploration term by ANET's distribution over the children (PUCT) instead of UCT, through the NumPy copy of ANET if ANET has no get_distribution
+ROLLOUT_BATCH_SIZE = 1  # Simulations advanced in lockstep per batched ANET call, 1 disables batching
+BATCH_HEX_ROLLOUTS = False  # Runs the batched rollouts of Hex on one vectorized BatchHex instead of one world each
+ARRAY_BACKED_TREE = False  # Structure-of-arrays tree instead of TreeNode objects, plain UCT search only
+MCTS_SOLVER = False  # Proves wins and losses in the tree and stops sampling them, not used by the array-backed tree
+PERFECT_PLAY_TABLE = None  # .npz table written by perfect_play.py, looked up instead of rolling out solved positions
+VALUE_NETWORK = False  # Trains a value network on game outcomes and evaluates MCTS leaves with it, not used by the array-backed tree
+LEAF_ROLLOUT_DEPTH = 0  # Plies rolled out from a leaf before the value network evaluates it, 0 evaluates the leaf itself
+TRANSPOSITION_TABLE_SIZE = 0  # Maximum number of nodes shared between transpositions, 0 searches a tree
+MCTS_WORKERS = 1  # Processes growing independent UCT trees from the root with single rollouts, 1 disables root parallelization
+MCTS_WORKER_WEIGHTS = 'mcts_workers.h5'  # ANET weights loaded by the MCTS workers
 
 # Simulated World
 GAME_TYPE = Game.Hex
@@ -23,17 +40,41 @@ LEDGE_BOARD = (0, 1, 0, 1, 0, 1, 0, 1, 0, 0, 2, 0, 0, 1, 1, 1)  # (0, 2, 0, 1, 0
 SIZE = 6 if GAME_TYPE == Game.Hex else len(LEDGE_BOARD)  # 3 <= k <= 10
 STATE_SIZE = 1 + (SIZE ** 2 if GAME_TYPE == Game.Hex else SIZE)
 NUMBER_OF_ACTIONS = SIZE ** 2 if GAME_TYPE == Game.Hex else int((SIZE ** 2 - SIZE) / 2) + 1
+USE_BITBOARD_HEX = False  # Bitboard and union-find Hex engine
+HEX_SYMMETRY = False  # Shares transpositions and cached predictions between a Hex position and its 180 degree rotation
+HEX_SYMMETRY_AUGMENTATION = False  # Also stores the rotation of every Hex case in RBUF, doubling the training cases
 
 # ANET
 ANET_EPSILON = 0.01
 ANET_EPSILON_DECAY = 1
 ANET_LEARNING_RATE = 0.01
-ANET_LOSS_FUNCTION = mse  # deepnet_cross_entropy, kl_divergence
-ANET_ACTIVATION_FUNCTION = relu  # linear, relu, sigmoid, or tanh
-ANET_OPTIMIZER = Adam  # SGD, Adagrad, Adam, or RMSprop
+# (module, name) of Keras objects, imported on first access so that parameters can be imported without TensorFlow
+KERAS_PARAMETERS = {
+    'ANET_LOSS_FUNCTION': ('keras.losses', 'mse'),  # deepnet_cross_entropy, kl_divergence
+    'ANET_ACTIVATION_FUNCTION': ('keras.activations', 'relu'),  # linear, relu, sigmoid, or tanh
+    'ANET_OPTIMIZER': ('keras.optimizers', 'Adam'),  # SGD, Adagrad, Adam, or RMSprop
+}
 ANET_DIMENSIONS = (STATE_SIZE, 256, 128, 64, NUMBER_OF_ACTIONS)
 ANET_BATCH_SIZE = 64
+NUMPY_INFERENCE = False  # Runs rollout predictions with a NumPy copy of ANET instead of Keras
+NUMPY_INFERENCE_WEIGHTS = 'numpy_inference.h5'  # ANET weights exported to the NumPy copy after every fit
+PREDICTION_CACHE_SIZE = 0  # Output distributions of the NumPy ANET cached by state, 0 disables the cache
 
 # TOPP parameters
 ANETS_TO_BE_CACHED = 6
 NUMBER_OF_GAMES = 10
+TOPP_WORKERS = 4  # Processes playing the pairings of the tournament, 1 plays them in this process
+TOPP_MODEL_DIRECTORY = 'models'  # Where the ANETs cached during training are read from, as <episode>.h5
+TOPP_RESULTS_FILE = None  # JSON store of pairing results keyed by model file hashes, so tournaments only play new pairings
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Resolves the Keras parameters when they are first read, typically when ANET is built.
+    """
+    if name not in KERAS_PARAMETERS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module, attribute = KERAS_PARAMETERS[name]
+    value = getattr(import_module(module), attribute)
+    globals()[name] = value
+    return value
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sys
+from time import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from world.simulated_world import SimulatedWorld
+from world.simulated_world_factory import SimulatedWorldFactory
+
+
+class PerfectPlayTable:
+    """
+    Winner under perfect play of every reachable position of a small game
+
+    ...
+
+    Positions are keyed by their Zobrist state hash. The table is stored as a sorted array of hashes
+    and an array of winners, 9 bytes per position, and looked up by binary search.
+    Solving enumerates the whole game tree, which is tractable for 3x3 and 4x4 Hex and short Ledge boards.
+
+    Methods
+    -------
+    solve(world: SimulatedWorld, config: Optional[Config] = None) -> PerfectPlayTable:
+        Solves every position reachable from the world's current state.
+    load(filename: str) -> PerfectPlayTable:
+        Reads a table saved with save.
+    save(filename: str) -> None:
+        Writes the table as a compressed .npz file.
+    get_winner(state_hash: int) -> int:
+        The winner under perfect play, or 0 for positions not in the table.
+    get_winning_actions(world: SimulatedWorld) -> List[int]:
+        The legal actions that keep a win for the player to move.
+    """
+
+    def __init__(self, state_hashes: np.ndarray, winners: np.ndarray) -> None:
+        order = np.argsort(state_hashes)
+        self.__state_hashes = state_hashes[order].astype(np.uint64)
+        self.__winners = winners[order].astype(np.int8)
+
+    def __len__(self) -> int:
+        return len(self.__state_hashes)
+
+    @staticmethod
+    def solve(world: SimulatedWorld, config: Optional[Config] = None) -> PerfectPlayTable:
+        winners: Dict[int, int] = {}
+        worlds: List[SimulatedWorld] = []  # One world per depth, reset to the position searched at that depth
+
+        def solve_position(depth: int) -> int:
+            position = worlds[depth]
+            if position.is_final_state():
+                return position.get_winner_id()
+            if depth + 1 == len(worlds):
+                worlds.append(SimulatedWorldFactory.get_simulated_world(config=config))
+
+            player = position.get_state()[0]
+            winner = 2 if player == 1 else 1
+            for action, legal in enumerate(position.get_legal_actions()):
+                if not legal:
+                    continue
+                child_hash = position.generate_state_hash(action)
+                if child_hash not in winners:
+                    # Stepped rather than reset to the child, as worlds only detect a win when it is played
+                    worlds[depth + 1].reset(position.get_state())
+                    worlds[depth + 1].step(action)
+                    winners[child_hash] = solve_position(depth + 1)
+                if winners[child_hash] == player:
+                    winner = player  # Every child is still solved, so the table covers all reachable positions
+            return winner
+
+        worlds.append(SimulatedWorldFactory.get_simulated_world(world.get_state(), config))
+        winners[world.get_state_hash()] = solve_position(0)
+        return PerfectPlayTable(
+            np.fromiter(winners.keys(), dtype=np.uint64, count=len(winners)),
+            np.fromiter(winners.values(), dtype=np.int8, count=len(winners)),
+        )
+
+    @staticmethod
+    def load(filename: str) -> PerfectPlayTable:
+        with np.load(filename) as table:
+            return PerfectPlayTable(table['state_hashes'], table['winners'])
+
+    def save(self, filename: str) -> None:
+        np.savez_compressed(filename, state_hashes=self.__state_hashes, winners=self.__winners)
+
+    def get_winner(self, state_hash: int) -> int:
+        key = np.uint64(state_hash)
+        index = int(np.searchsorted(self.__state_hashes, key))
+        if index < len(self.__state_hashes) and self.__state_hashes[index] == key:
+            return int(self.__winners[index])
+        return 0
+
+    def get_winning_actions(self, world: SimulatedWorld) -> List[int]:
+        player = world.get_state()[0]
+        return [
+            action for action, legal in enumerate(world.get_legal_actions())
+            if legal and self.get_winner(world.generate_state_hash(action)) == player
+        ]
+
+
+if __name__ == "__main__":
+    # Solves the game configured in parameters.py: python perfect_play.py <table>.npz
+    start_time = time()
+    table = PerfectPlayTable.solve(SimulatedWorldFactory.get_simulated_world())
+    table.save(sys.argv[1])
+    print(f'Solved {len(table)} positions in {time() - start_time:.1f}s')
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    Bounded map from states to ANET output distributions, so rollouts revisiting a position skip the forward pass.
+    States are keyed by their bytes, which is compact as every cell fits in a byte. The least recently used
+    entry is evicted when the cache is full, and the owner clears the cache whenever its weights change.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.__capacity = capacity
+        self.__distributions: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__distributions)
+
+    @staticmethod
+    def get_key(state: Tuple[int, ...]) -> bytes:
+        return bytes(state)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        distribution = self.__distributions.get(key)
+        if distribution is None:
+            self.misses += 1
+        else:
+            self.__distributions.move_to_end(key)
+            self.hits += 1
+        return distribution
+
+    def put(self, key: bytes, distribution: np.ndarray) -> None:
+        self.__distributions[key] = distribution
+        self.__distributions.move_to_end(key)
+        if len(self.__distributions) > self.__capacity:
+            self.__distributions.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.__distributions.clear()
+
+    def get_hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def reset_statistics(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -1,14 +1,22 @@
-import random
 from time import time
-from typing import Tuple
+from typing import List, Optional, Tuple, Union
 
-import numpy as np
-
-import parameters
 from ANET import ANET
+from anytime_search import AnytimeSearch
+from array_mcts import ArrayMCTS
+from config import Config
 from game import Game
-from MCTS import MCTS
+from MCTS import MCTS, BatchPolicy
+from numpy_anet import NumpyANET, model_path
+from perfect_play import PerfectPlayTable
+from replay_buffer import ReplayBuffer
+from root_parallel_mcts import RootParallelMCTS
+from self_play_actors import Case, SelfPlayActors
+from TreeNode import TreeNode
+from value_network import ValueNetwork
 from visualize import Visualize
+from world.hex_symmetry import HexSymmetry
+from world.simulated_world import SimulatedWorld
 from world.simulated_world_factory import SimulatedWorldFactory
 
 
@@ -25,96 +33,293 @@ class ReinforcementLearner:
     -------
     run() -> None:
         Runs all episodes with pivotal parameters
-    run_one_game(player_1: ANET, player_2: ANET, visualize=False) -> None:
+    play_episode() -> List[Case]:
+        Plays one self-play game and returns its (state, target distribution, outcome) cases.
+    load_weights(filename: str) -> None:
+        Loads saved weights into the ANET.
+    get_loss_history() -> List[float]:
+        ANET's training loss per episode.
+    get_search_statistics() -> Tuple[int, float]:
+        Rollouts and seconds of search, in this process, its root parallel workers and its self-play actors.
+    get_rollouts_per_second() -> float:
+        Rollouts per second of search, over the same searches.
+    run_one_game(player_1: ANET, player_2: ANET, visualize=False, config=None) -> int:
         Runs excatly one game with the provided players.
     """
 
-    def __init__(self) -> None:
-        self.__actual_game = SimulatedWorldFactory.get_simulated_world()
-        self.__replay_buffer = np.empty((0, parameters.STATE_SIZE + parameters.NUMBER_OF_ACTIONS))  # RBUF
+    def __init__(self, config: Optional[Config] = None) -> None:
+        self.__config = config or Config.get_default()
+        self.__actual_game = SimulatedWorldFactory.get_simulated_world(config=self.__config)
+        self.__replay_buffer = ReplayBuffer(
+            self.__config.REPLAY_BUFFER_SIZE,
+            self.__config.STATE_SIZE,
+            self.__config.NUMBER_OF_ACTIONS,
+            directory=self.__config.REPLAY_BUFFER_DIRECTORY,
+        )  # RBUF
         self.__ANET = ANET()
+        self.__inference_anet: Optional[NumpyANET] = None  # Used by rollouts, and for the PUCT priors
+        if self.__config.NUMPY_INFERENCE or (self.__config.PUCT and not hasattr(self.__ANET, 'get_distribution')):
+            self.__inference_anet = NumpyANET(
+                epsilon=self.__config.ANET_EPSILON,
+                cache_size=self.__config.PREDICTION_CACHE_SIZE,
+                symmetric_cache=self.__config.HEX_SYMMETRY and self.__config.GAME_TYPE == Game.Hex,
+            )
+        self.__value_network: Optional[ValueNetwork] = ValueNetwork(self.__config) if self.__config.VALUE_NETWORK else None
 
-        self.__episodes = parameters.EPISODES
-        self.__min_number_of_roullouts = parameters.MIN_NUMBER_OF_ROLLOUTS
-        self.__simulation_time_out = parameters.SIMULATION_TIME_OUT
-        self.__caching_interval = self.__episodes // (parameters.ANETS_TO_BE_CACHED - 1)
-        self.__batch_size = parameters.ANET_BATCH_SIZE
-        self.__replay_buffer_size = parameters.REPLAY_BUFFER_SIZE
-        self.__buffer_insertion_index = 0
+        self.__episodes = self.__config.EPISODES
+        self.__min_number_of_roullouts = self.__config.MIN_NUMBER_OF_ROLLOUTS
+        self.__simulation_time_out = self.__config.SIMULATION_TIME_OUT
+        self.__rollout_batch_size = self.__config.ROLLOUT_BATCH_SIZE
+        self.__array_backed_tree = self.__config.ARRAY_BACKED_TREE
+        self.__puct = self.__config.PUCT
+        self.__number_of_mcts_workers = self.__config.MCTS_WORKERS
+        self.__number_of_self_play_actors = self.__config.SELF_PLAY_ACTORS
+        self.__weight_publishing_interval = self.__config.WEIGHT_PUBLISHING_INTERVAL
+        self.__root_parallel_mcts: Optional[RootParallelMCTS] = None
+        self.__perfect_play_table: Optional[PerfectPlayTable] = None
+        if self.__config.PERFECT_PLAY_TABLE is not None:
+            self.__perfect_play_table = PerfectPlayTable.load(self.__config.PERFECT_PLAY_TABLE)
+        self.__anytime_search: Optional[AnytimeSearch] = None
+        if self.__config.ANYTIME_SEARCH:
+            self.__anytime_search = AnytimeSearch(
+                self.__min_number_of_roullouts,
+                self.__simulation_time_out,
+                self.__config.NUMBER_OF_ACTIONS,
+                self.__config.ANYTIME_PHASE_EXPONENT,
+            )
+        self.__weights_version = 0
+        self.__number_of_rollouts = 0  # Rollouts run by this process and its workers and actors, with the time spent on them
+        self.__search_time = 0.0
+        self.__caching_interval = self.__episodes // (self.__config.ANETS_TO_BE_CACHED - 1)
+        self.__batch_size = self.__config.ANET_BATCH_SIZE
+        self.__augment_cases = self.__config.HEX_SYMMETRY_AUGMENTATION and self.__config.GAME_TYPE == Game.Hex
 
-    def __run_one_episode(self,) -> None:
+    def play_episode(self) -> List[Case]:
+        """
+        Plays one self-play game and returns its (state, target distribution, outcome) cases.
+        """
         initial_game_state = self.__actual_game.reset()
-        monte_carlo_tree = MCTS(initial_game_state)
+        rollout_anet = self.__inference_anet or self.__ANET
+        monte_carlo_tree: Union[MCTS, ArrayMCTS]
+        if self.__array_backed_tree:
+            monte_carlo_tree = ArrayMCTS(initial_game_state, config=self.__config)
+        else:
+            monte_carlo_tree = MCTS(
+                initial_game_state,
+                rollout_anet.get_distribution if self.__puct else None,
+                self.__perfect_play_table,
+                self.__value_network.get_value if self.__value_network is not None else None,
+                self.__config,
+            )
         root_state = initial_game_state
+        targets = []
 
         while not self.__actual_game.is_final_state():
-            monte_carlo_game = SimulatedWorldFactory.get_simulated_world(root_state)
-
-            number_of_rollouts = 0
-            start_time = time()
-            while time() - start_time < self.__simulation_time_out or number_of_rollouts < self.__min_number_of_roullouts:
-                monte_carlo_tree.do_one_simulation(self.__ANET.choose_epsilon_greedy, monte_carlo_game)
-                monte_carlo_game.reset(root_state)
-                number_of_rollouts += 1
-            # print(f'Rollouts: {number_of_rollouts}')
+            if self.__root_parallel_mcts is not None:
+                weights = (self.__config.MCTS_WORKER_WEIGHTS, self.__weights_version)
+                monte_carlo_tree = self.__root_parallel_mcts.search(root_state, weights)
+            else:
+                self.__run_simulations(monte_carlo_tree, root_state)
 
             target_distribution = monte_carlo_tree.get_normalized_distribution()
-            self.__add_to_replay_buffer(root_state, target_distribution)
+            targets.append((root_state, target_distribution))
 
-            action = monte_carlo_tree.root.tree_policy()
+            action = monte_carlo_tree.choose_action()
             next_state, _ = self.__actual_game.step(action)
 
             monte_carlo_tree.update_root(action)
             root_state = next_state
 
+        if monte_carlo_tree.reuse_statistics:
+            inherited_visits = sum(inherited for inherited, _ in monte_carlo_tree.reuse_statistics)
+            searched_visits = sum(visits for _, visits in monte_carlo_tree.reuse_statistics)
+            print(f'Visits inherited by new roots: {inherited_visits}/{searched_visits} ({inherited_visits / max(searched_visits, 1):.0%})')
+        if isinstance(monte_carlo_tree, MCTS) and self.__root_parallel_mcts is None and monte_carlo_tree.transposition_table is not None:
+            transposition_table = monte_carlo_tree.transposition_table  # Created with the episode's tree
+            print(f'Transposition table hit rate: {transposition_table.get_hit_rate():.0%} ({transposition_table.evictions} evictions)')
+        if self.__anytime_search is not None:
+            print(f'Rollouts saved by stopping early: {self.__anytime_search.saved_rollouts}')
+            self.__anytime_search.saved_rollouts = 0
+        if self.__inference_anet is not None and self.__inference_anet.prediction_cache is not None:
+            prediction_cache = self.__inference_anet.prediction_cache
+            print(f'Prediction cache hit rate: {prediction_cache.get_hit_rate():.0%} ({prediction_cache.evictions} evictions)')
+            prediction_cache.reset_statistics()
+
+        outcome = TreeNode.player_reward[self.__actual_game.get_winner_id()]
+        return [(state, target_distribution, outcome) for state, target_distribution in targets]
+
+    def get_loss_history(self) -> List[float]:
+        return list(self.__ANET.loss_history)
+
+    def get_search_statistics(self) -> Tuple[int, float]:
+        return self.__number_of_rollouts, self.__search_time
+
+    def get_rollouts_per_second(self) -> float:
+        return self.__number_of_rollouts / self.__search_time if self.__search_time > 0 else 0.0
+
+    def load_weights(self, filename: str) -> None:
+        self.__ANET.load(filename)
+        if self.__inference_anet is not None:
+            self.__inference_anet.load(model_path(filename))
+        if self.__value_network is not None:
+            self.__value_network.load(ValueNetwork.get_weights_filename(filename))
+
+    def __run_one_episode(self, episode: int, model_version: int, cases: List[Case]) -> None:
+        for root_state, target_distribution, outcome in cases:
+            self.__replay_buffer.add(root_state, target_distribution, episode, model_version, outcome=outcome)
+            if self.__augment_cases and HexSymmetry.rotate_state(root_state) != root_state:
+                # The rotated position is equivalent, so its target is the rotated distribution
+                rotated_state = HexSymmetry.rotate_state(root_state)
+                rotated_distribution = HexSymmetry.rotate_distribution(target_distribution)
+                self.__replay_buffer.add(rotated_state, rotated_distribution, episode, model_version, outcome=outcome)
+        self.__replay_buffer.flush()
+
         # Train ANET on a random minibatch of cases from RBUF
-        random_rows = self.__sample_replay_buffer()
-        self.__ANET.fit(self.__replay_buffer[random_rows])
+        indices = self.__replay_buffer.sample_indices(self.__batch_size)
+        self.__ANET.fit(self.__replay_buffer.get(indices))
+        self.__export_inference_weights()
+        if self.__value_network is not None:
+            self.__value_network.fit(*self.__replay_buffer.get_outcomes(indices))
+
+    def __run_simulations(self, monte_carlo_tree: Union[MCTS, ArrayMCTS], root_state: Tuple[int, ...]) -> None:
+        monte_carlo_games = [SimulatedWorldFactory.get_simulated_world(root_state, self.__config) for _ in range(self.__rollout_batch_size)]
+
+        start_time = time()
+        if self.__anytime_search is not None:
+            self.__anytime_search.start(sum(monte_carlo_games[0].get_legal_actions()))
+            while self.__anytime_search.should_continue(monte_carlo_tree):
+                self.__run_simulation_batch(monte_carlo_tree, monte_carlo_games, root_state)
+                self.__anytime_search.add_rollouts(len(monte_carlo_games))
+        else:
+            number_of_rollouts = 0
+            while time() - start_time < self.__simulation_time_out or number_of_rollouts < self.__min_number_of_roullouts:
+                self.__run_simulation_batch(monte_carlo_tree, monte_carlo_games, root_state)
+                number_of_rollouts += len(monte_carlo_games)
+            # print(f'Rollouts: {number_of_rollouts}')
+        self.__search_time += time() - start_time
 
-    def __add_to_replay_buffer(self, root_state: Tuple[int, ...], target_distribution: Tuple[float, ...]):
-        training_instance = np.array([root_state + target_distribution], dtype=np.float64)
-        if self.__buffer_insertion_index < self.__replay_buffer_size:
-            self.__replay_buffer = np.append(self.__replay_buffer, training_instance, axis=0)  # type: ignore
+    def __run_simulation_batch(
+        self,
+        monte_carlo_tree: Union[MCTS, ArrayMCTS],
+        monte_carlo_games: List[SimulatedWorld],
+        root_state: Tuple[int, ...],
+    ) -> None:
+        rollout_anet = self.__inference_anet or self.__ANET
+        if self.__rollout_batch_size > 1:
+            monte_carlo_tree.do_batched_simulations(self.__get_batch_policy(rollout_anet), monte_carlo_games)
         else:
-            i = self.__buffer_insertion_index % self.__replay_buffer_size
-            self.__replay_buffer[i] = training_instance  # type: ignore
-        self.__buffer_insertion_index += 1
+            monte_carlo_tree.do_one_simulation(rollout_anet.choose_epsilon_greedy, monte_carlo_games[0])
+        for monte_carlo_game in monte_carlo_games:
+            monte_carlo_game.reset(root_state)
+        self.__number_of_rollouts += len(monte_carlo_games)
 
-    def __sample_replay_buffer(self):
-        number_of_rows = min(self.__buffer_insertion_index, self.__replay_buffer_size)
-        batch_size = min(number_of_rows, self.__batch_size)
-        return random.sample(range(0, number_of_rows), batch_size)
+    @staticmethod
+    def __get_batch_policy(anet: Union[ANET, NumpyANET]) -> BatchPolicy:
+        """
+        The ANET's epsilon greedy policy for a batch of states, with one forward pass if the ANET supports it.
+        """
+        if hasattr(anet, 'choose_epsilon_greedy_batch'):
+            return anet.choose_epsilon_greedy_batch
+        return lambda states, legal_actions: [anet.choose_epsilon_greedy(s, valid_actions) for s, valid_actions in zip(states, legal_actions)]
 
     def run(self) -> None:
         """
         Runs all episodes with pivotal parameters.
         Visualizes one round at the end.
         """
+        self.__config.save(self.__config.CONFIG_FILE)
         self.__ANET.save('0.h5')  # Save the untrained ANET prior to episode 1
-        for episode in range(1, self.__episodes + 1):
-            print('\nEpisode:', episode)
-            self.__run_one_episode()
-
-            if episode % self.__caching_interval == 0:
-                # Save ANET for later use in tournament play.
-                self.__ANET.save(str(episode) + '.h5')
+        self.__export_inference_weights()
+        if self.__number_of_self_play_actors > 0:
+            self.__run_actor_learner()
+        else:
+            self.__run_sequential()
 
         Visualize.plot_loss(self.__ANET.loss_history)
+        if self.__value_network is not None:
+            print(f'Value network loss: {self.__value_network.loss_history[-1]:.4f}')
         Visualize.plot_epsilon(self.__ANET.epsilon_history)
 
-        if parameters.VISUALIZE_GAMES:
+        if self.__config.VISUALIZE_GAMES:
             print('Showing one episode with the greedy strategy.')
-            ReinforcementLearner.run_one_game(self.__ANET, self.__ANET, True)
+            ReinforcementLearner.run_one_game(self.__ANET, self.__ANET, True, self.__config)
+
+    def __run_sequential(self) -> None:
+        if self.__number_of_mcts_workers > 1:
+            self.__root_parallel_mcts = RootParallelMCTS(self.__number_of_mcts_workers, self.__config)
+
+        for episode in range(1, self.__episodes + 1):
+            print('\nEpisode:', episode)
+            if self.__root_parallel_mcts is not None:
+                # The workers load the weights the ANET has after the previous episode
+                self.__ANET.save(self.__config.MCTS_WORKER_WEIGHTS)
+                self.__weights_version = episode
+                self.__root_parallel_mcts.reset_statistics()
+
+            self.__run_one_episode(episode, episode - 1, self.play_episode())
+
+            if self.__root_parallel_mcts is not None:
+                rollouts_per_second = ', '.join(f'{rate:.1f}' for rate in self.__root_parallel_mcts.get_rollouts_per_second())
+                print(f'Rollouts/s per worker: {rollouts_per_second}')
+                self.__add_search_statistics(*self.__root_parallel_mcts.get_search_statistics())
+
+            self.__cache_ANET(episode)
+
+        if self.__root_parallel_mcts is not None:
+            self.__root_parallel_mcts.close()
+            self.__root_parallel_mcts = None
+
+    def __run_actor_learner(self) -> None:
+        """
+        Trains on episodes played concurrently by the self-play actors, in the order they finish.
+        """
+        actors = SelfPlayActors(ReinforcementLearner, self.__number_of_self_play_actors, self.__config)
+        actors.publish_weights(self.__ANET, 0, self.__value_network)
+        actors.start()
+
+        for episode in range(1, self.__episodes + 1):
+            print('\nEpisode:', episode)
+            model_version, cases = actors.get_episode()
+            self.__run_one_episode(episode, model_version, cases)
+
+            if episode % self.__weight_publishing_interval == 0:
+                actors.publish_weights(self.__ANET, episode, self.__value_network)
+
+            self.__cache_ANET(episode)
+
+        actors.stop()
+        self.__add_search_statistics(*actors.get_search_statistics())
+
+    def __add_search_statistics(self, number_of_rollouts: int, search_time: float) -> None:
+        self.__number_of_rollouts += number_of_rollouts
+        self.__search_time += search_time
+
+    def __export_inference_weights(self) -> None:
+        """
+        Copies the weights and exploration rate of the trained ANET to the NumPy ANET used by rollouts.
+        """
+        if self.__inference_anet is None:
+            return
+        self.__ANET.save(self.__config.NUMPY_INFERENCE_WEIGHTS)
+        self.__inference_anet.load(model_path(self.__config.NUMPY_INFERENCE_WEIGHTS))
+        if self.__ANET.epsilon_history:
+            self.__inference_anet.epsilon = self.__ANET.epsilon_history[-1]
+
+    def __cache_ANET(self, episode: int) -> None:
+        if episode % self.__caching_interval == 0:
+            # Save ANET for later use in tournament play.
+            self.__ANET.save(str(episode) + '.h5')
 
     @staticmethod
-    def run_one_game(player_1: ANET, player_2: ANET, visualize: bool) -> int:
+    def run_one_game(player_1: ANET, player_2: ANET, visualize: bool, config: Optional[Config] = None) -> int:
         """
         Runs excatly one game with the provided players.
         """
-        world = SimulatedWorldFactory.get_simulated_world()
+        config = config or Config.get_default()
+        world = SimulatedWorldFactory.get_simulated_world(config=config)
         current_state = world.reset()
 
-        if visualize and parameters.GAME_TYPE == Game.Hex:
+        if visualize and config.GAME_TYPE == Game.Hex:
             Visualize.initialize_board(current_state)
 
         players = (player_1, player_2)
@@ -129,7 +334,7 @@ class ReinforcementLearner:
             # Alternating players
             i = (i + 1) % 2
 
-            if visualize and parameters.GAME_TYPE == Game.Hex:
+            if visualize and config.GAME_TYPE == Game.Hex:
                 Visualize.draw_board(current_state, winner, str(player_1), str(player_2))
 
         print(f'Player {winner} won the game.')
@@ -0,0 +1,186 @@
+import json
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity replay buffer (RBUF)
+
+    ...
+
+    States and target distributions are stored in preallocated arrays with compact dtypes,
+    and the oldest cases are overwritten once the buffer is full. Every case also records the
+    episode it was generated in, the version of the ANET that generated it and the game's outcome.
+
+    If a directory is given, the arrays are memory-mapped .npy files in that directory. The buffer
+    is then reopened with its contents by later runs, so generated cases are reused across runs.
+
+    Methods
+    -------
+    add(state, target_distribution, episode=0, model_version=0, priority=None, outcome=0) -> None:
+        Inserts one case in O(1).
+    sample(batch_size: int) -> np.ndarray:
+        Returns a minibatch of rows (state + target distribution), ready for ANET.fit.
+    get_outcomes(indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        Returns the states and game outcomes of the given rows, ready for ValueNetwork.fit.
+    update_priorities(indices: np.ndarray, priorities: Sequence[float]) -> None:
+        Sets the sampling priority of the given rows when prioritized sampling is enabled.
+    flush() -> None:
+        Writes a memory-mapped buffer to disk.
+    """
+
+    __metadata_file = 'metadata.json'
+
+    def __init__(
+        self,
+        capacity: int,
+        state_size: int,
+        number_of_actions: int,
+        prioritized: bool = False,
+        alpha: float = 0.6,
+        directory: Optional[str] = None,
+    ) -> None:
+        self.__capacity = capacity
+        self.__directory = directory
+        self.__insertion_index = 0
+        self.__number_of_cases = 0
+        self.__rng = np.random.default_rng()
+
+        # Prioritized sampling draws row i with probability p_i^alpha / sum_j p_j^alpha
+        self.__prioritized = prioritized
+        self.__alpha = alpha
+        self.__max_priority = 1.0
+
+        shapes = {
+            'states': ((capacity, state_size), np.int8),
+            'targets': ((capacity, number_of_actions), np.float32),
+            'episodes': ((capacity,), np.int32),
+            'model_versions': ((capacity,), np.int32),
+            'outcomes': ((capacity,), np.int8),  # Reward for player 1 of the game the case is from
+        }
+        if prioritized:
+            shapes['priorities'] = ((capacity,), np.float32)
+
+        if directory is None:
+            self.__arrays = {name: np.zeros(shape, dtype=dtype) for name, (shape, dtype) in shapes.items()}
+        else:
+            self.__arrays = self.__open_arrays(directory, shapes)
+
+        self.__states = self.__arrays['states']
+        self.__targets = self.__arrays['targets']
+        self.__episodes = self.__arrays['episodes']
+        self.__model_versions = self.__arrays['model_versions']
+        self.__outcomes = self.__arrays['outcomes']
+        self.__priorities = self.__arrays.get('priorities')
+        if self.__priorities is not None and self.__number_of_cases > 0:
+            self.__max_priority = max(self.__max_priority, float(np.max(self.__priorities[:self.__number_of_cases])))
+
+    def __open_arrays(self, directory: str, shapes: Dict[str, Tuple[Tuple[int, ...], type]]) -> Dict[str, np.ndarray]:
+        """
+        Reopens the arrays of a buffer on disk, or creates them. Arrays must have the dtype and shape
+        recorded in the metadata and expected by this buffer. A buffer holding cases cannot be reopened without
+        one of its arrays, except that missing priorities are filled with 1 so every case can be sampled.
+        """
+        os.makedirs(directory, exist_ok=True)
+        metadata_path = os.path.join(directory, ReplayBuffer.__metadata_file)
+        stored_arrays = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as metadata_file:
+                metadata = json.load(metadata_file)
+            if metadata['capacity'] != self.__capacity:
+                raise ValueError(f'Replay buffer in {directory} has capacity {metadata["capacity"]}, expected {self.__capacity}')
+            self.__insertion_index = metadata['insertion_index']
+            self.__number_of_cases = metadata['number_of_cases']
+            stored_arrays = metadata.get('arrays', {})
+
+        arrays = {}
+        for name, (shape, dtype) in shapes.items():
+            path = os.path.join(directory, name + '.npy')
+            if os.path.exists(path):
+                arrays[name] = np.load(path, mmap_mode='r+')
+                layouts = [(arrays[name].dtype, arrays[name].shape)]
+                if name in stored_arrays:
+                    layouts.append((np.dtype(stored_arrays[name]['dtype']), tuple(stored_arrays[name]['shape'])))
+                for stored_dtype, stored_shape in layouts:
+                    if stored_dtype != np.dtype(dtype) or stored_shape != shape:
+                        raise ValueError(f'Replay buffer in {directory} has {name} of {stored_dtype} {stored_shape}, expected {np.dtype(dtype)} {shape}')
+            elif self.__number_of_cases > 0 and name != 'priorities':
+                raise ValueError(f'Replay buffer in {directory} has {self.__number_of_cases} cases but no {name}, start a new buffer')
+            else:
+                arrays[name] = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+                if name == 'priorities' and self.__number_of_cases > 0:
+                    arrays[name][:] = 1
+                    print(f'Replay buffer in {directory}: added priority 1 to its {self.__number_of_cases} cases')
+        return arrays
+
+    def __len__(self) -> int:
+        return self.__number_of_cases
+
+    def add(
+        self,
+        state: Tuple[int, ...],
+        target_distribution: Tuple[float, ...],
+        episode: int = 0,
+        model_version: int = 0,
+        priority: Optional[float] = None,
+        outcome: int = 0,
+    ) -> None:
+        i = self.__insertion_index
+        self.__states[i] = state
+        self.__targets[i] = target_distribution
+        self.__episodes[i] = episode
+        self.__model_versions[i] = model_version
+        self.__outcomes[i] = outcome
+        if self.__priorities is not None:
+            # New cases get the highest priority seen so far unless told otherwise
+            self.__priorities[i] = self.__max_priority if priority is None else priority
+            self.__max_priority = max(self.__max_priority, float(self.__priorities[i]))
+
+        self.__insertion_index = (i + 1) % self.__capacity
+        self.__number_of_cases = min(self.__number_of_cases + 1, self.__capacity)
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        batch_size = min(batch_size, self.__number_of_cases)
+        if not self.__prioritized:
+            return self.__rng.choice(self.__number_of_cases, size=batch_size, replace=False)
+
+        probabilities = self.__priorities[:self.__number_of_cases].astype(np.float64) ** self.__alpha
+        probabilities /= probabilities.sum()
+        return self.__rng.choice(self.__number_of_cases, size=batch_size, replace=False, p=probabilities)
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        # Gathers the rows straight from the (memory-mapped) arrays into the minibatch
+        return np.hstack((self.__states[indices], self.__targets[indices]))
+
+    def get_metadata(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return self.__episodes[indices], self.__model_versions[indices]
+
+    def get_outcomes(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return self.__states[indices].astype(np.float32), self.__outcomes[indices].astype(np.float32)
+
+    def sample(self, batch_size: int) -> np.ndarray:
+        return self.get(self.sample_indices(batch_size))
+
+    def update_priorities(self, indices: np.ndarray, priorities: Sequence[float]) -> None:
+        assert self.__priorities is not None, 'Prioritized sampling is not enabled'
+        self.__priorities[indices] = priorities
+        self.__max_priority = max(self.__max_priority, float(np.max(priorities)))
+
+    def flush(self) -> None:
+        if self.__directory is None:
+            return
+        for array in self.__arrays.values():
+            array.flush()
+        metadata = {
+            'capacity': self.__capacity,
+            'insertion_index': self.__insertion_index,
+            'number_of_cases': self.__number_of_cases,
+            'arrays': {name: {'dtype': array.dtype.str, 'shape': array.shape} for name, array in self.__arrays.items()},
+        }
+        metadata_path = os.path.join(self.__directory, ReplayBuffer.__metadata_file)
+        with open(metadata_path + '.tmp', 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+        os.replace(metadata_path + '.tmp', metadata_path)
@@ -0,0 +1,129 @@
+from math import ceil
+from multiprocessing import get_context
+from time import time
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+
+from config import Config
+from game import Game
+from MCTS import MCTS, RootStatistics
+from numpy_anet import NumpyANET, model_path
+from world.simulated_world_factory import SimulatedWorldFactory
+
+if TYPE_CHECKING:
+    from ANET import ANET
+
+Weights = Tuple[str, int]  # (filename, version)
+WorkerResult = Tuple[int, RootStatistics, int, float]  # (root visits, root statistics, rollouts, seconds)
+
+# Per-process state of the pool workers
+_worker_anet: Optional[Union['ANET', NumpyANET]] = None
+_worker_weights: Optional[Weights] = None
+
+
+def _create_worker_anet(config: Config) -> Union['ANET', NumpyANET]:
+    """
+    The Keras ANET, or a NumpyANET with NUMPY_INFERENCE or when the ANET cannot load saved weights.
+    """
+    if not config.NUMPY_INFERENCE:
+        config.apply_to_parameters()  # ANET reads the parameters when imported
+        from ANET import ANET  # Workers using NumpyANET never load TensorFlow
+        if hasattr(ANET, 'load'):
+            return ANET()
+    symmetric_cache = config.HEX_SYMMETRY and config.GAME_TYPE == Game.Hex
+    return NumpyANET(epsilon=config.ANET_EPSILON, cache_size=config.PREDICTION_CACHE_SIZE, symmetric_cache=symmetric_cache)
+
+
+def _grow_tree(
+    root_state: Tuple[int, ...],
+    weights: Weights,
+    min_number_of_rollouts: int,
+    simulation_time_out: float,
+    config: Config,
+) -> WorkerResult:
+    global _worker_anet, _worker_weights
+    if _worker_anet is None:
+        _worker_anet = _create_worker_anet(config)
+    if _worker_weights != weights:
+        # The weights were saved with ANET.save, whose filenames only ANET.load resolves itself
+        _worker_anet.load(model_path(weights[0]) if isinstance(_worker_anet, NumpyANET) else weights[0])
+        _worker_weights = weights
+
+    monte_carlo_tree = MCTS(root_state, config=config)
+    monte_carlo_game = SimulatedWorldFactory.get_simulated_world(root_state, config)
+
+    number_of_rollouts = 0
+    start_time = time()
+    while time() - start_time < simulation_time_out or number_of_rollouts < min_number_of_rollouts:
+        monte_carlo_tree.do_one_simulation(_worker_anet.choose_epsilon_greedy, monte_carlo_game)
+        monte_carlo_game.reset(root_state)
+        number_of_rollouts += 1
+
+    return monte_carlo_tree.root.visits, monte_carlo_tree.get_root_statistics(), number_of_rollouts, time() - start_time
+
+
+class RootParallelMCTS:
+    """
+    Root parallel Monte Carlo Tree Search
+
+    ...
+
+    Every worker process grows an independent tree from the same root state with its own ANET,
+    loaded from the latest saved weights. The root statistics of all trees are merged into one tree,
+    which is then used for the target distribution and move selection. The workers run single rollouts
+    in UCT trees, so configurations enabling an MCTS option they do not implement are rejected with a ValueError.
+
+    Methods
+    -------
+    search(root_state: Tuple[int, ...], weights: Weights) -> MCTS:
+        Runs the rollouts for one move and returns the merged tree.
+    get_rollouts_per_second() -> Tuple[float, ...]:
+        Rollouts per second of each worker since the last reset.
+    get_search_statistics() -> Tuple[int, float]:
+        Rollouts and seconds of search of all workers since the last reset.
+    """
+
+    def __init__(self, number_of_workers: int, config: Optional[Config] = None) -> None:
+        self.__config = config or Config.get_default()
+        unsupported_options = [name for name, enabled in (
+            ('PUCT', self.__config.PUCT),
+            ('VALUE_NETWORK', self.__config.VALUE_NETWORK),
+            ('PERFECT_PLAY_TABLE', self.__config.PERFECT_PLAY_TABLE is not None),
+            ('ROLLOUT_BATCH_SIZE', self.__config.ROLLOUT_BATCH_SIZE > 1),
+            ('ANYTIME_SEARCH', self.__config.ANYTIME_SEARCH),
+        ) if enabled]
+        if unsupported_options:
+            raise ValueError(f'MCTS_WORKERS does not support {", ".join(unsupported_options)}')
+        self.__number_of_workers = number_of_workers
+        self.__pool = get_context('spawn').Pool(number_of_workers)
+
+        self.__min_number_of_rollouts = ceil(self.__config.MIN_NUMBER_OF_ROLLOUTS / number_of_workers)
+        self.__simulation_time_out = self.__config.SIMULATION_TIME_OUT
+        self.reset_statistics()
+
+    def search(self, root_state: Tuple[int, ...], weights: Weights) -> MCTS:
+        arguments = [(root_state, weights, self.__min_number_of_rollouts, self.__simulation_time_out, self.__config)] * self.__number_of_workers
+        results: List[WorkerResult] = self.__pool.starmap(_grow_tree, arguments)
+
+        monte_carlo_tree = MCTS(root_state, config=self.__config)
+        for worker, (root_visits, statistics, number_of_rollouts, seconds) in enumerate(results):
+            monte_carlo_tree.merge_root_statistics(root_visits, statistics)
+            self.__rollouts[worker] += number_of_rollouts
+            self.__search_time[worker] += seconds
+        return monte_carlo_tree
+
+    def get_rollouts_per_second(self) -> Tuple[float, ...]:
+        return tuple(
+            rollouts / seconds if seconds > 0 else 0.0
+            for rollouts, seconds in zip(self.__rollouts, self.__search_time)
+        )
+
+    def get_search_statistics(self) -> Tuple[int, float]:
+        return sum(self.__rollouts), sum(self.__search_time)
+
+    def reset_statistics(self) -> None:
+        self.__rollouts = [0 for _ in range(self.__number_of_workers)]
+        self.__search_time = [0.0 for _ in range(self.__number_of_workers)]
+
+    def close(self) -> None:
+        self.__pool.close()
+        self.__pool.join()
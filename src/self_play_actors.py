@@ -0,0 +1,119 @@
+from importlib import import_module
+from multiprocessing import get_context
+from queue import Empty
+from typing import TYPE_CHECKING, List, Optional, Protocol, Tuple
+
+from config import Config
+
+if TYPE_CHECKING:
+    from ANET import ANET
+    from value_network import ValueNetwork
+
+Case = Tuple[Tuple[int, ...], Tuple[float, ...], int]  # (s, target_distribution, reward for player 1 at the end of the game)
+
+
+class SelfPlayer(Protocol):
+    def play_episode(self) -> List[Case]:
+        ...
+
+    def load_weights(self, filename: str) -> None:
+        ...
+
+    def get_search_statistics(self) -> Tuple[int, float]:
+        ...
+
+
+def _run_actor(player_module, player_name, config, case_queue, weights_version, weights_lock, stop_event) -> None:
+    # The player is imported by name once the parameters are applied, since its module may import ANET
+    config.apply_to_parameters()
+    player: SelfPlayer = getattr(import_module(player_module), player_name)(config)
+    version = -1
+    while not stop_event.is_set():
+        if weights_version.value != version:
+            with weights_lock:
+                version = weights_version.value
+                player.load_weights(config.SELF_PLAY_WEIGHTS)
+        rollouts, seconds = player.get_search_statistics()
+        cases = player.play_episode()
+        new_rollouts, new_seconds = player.get_search_statistics()
+        case_queue.put((version, cases, new_rollouts - rollouts, new_seconds - seconds))
+    case_queue.cancel_join_thread()  # The learner has stopped reading, unsent cases are discarded
+
+
+class SelfPlayActors:
+    """
+    Self-play actor processes
+
+    ...
+
+    Every actor plays self-play episodes with its own ANET and sends the (state, target distribution, outcome)
+    cases of each episode to the learner. The learner publishes new weights through a shared file,
+    which the actors load before their next episode.
+
+    Methods
+    -------
+    get_episode() -> Tuple[int, List[Case]]:
+        Blocks until an actor has finished an episode and returns the weights version it used and its cases.
+    publish_weights(anet: ANET, version: int, value_network: Optional[ValueNetwork] = None) -> None:
+        Saves the weights of the learner's ANET, and value network if any, for the actors.
+    get_search_statistics() -> Tuple[int, float]:
+        Rollouts and seconds of search of the episodes returned so far.
+    stop() -> None:
+        Stops and joins all actors.
+    """
+
+    def __init__(self, player_type: type, number_of_actors: int, config: Optional[Config] = None) -> None:
+        self.__config = config or Config.get_default()
+        context = get_context('spawn')
+        self.__case_queue = context.Queue()
+        self.__weights_version = context.Value('i', 0)
+        self.__weights_lock = context.Lock()
+        self.__stop_event = context.Event()
+        self.__number_of_rollouts = 0
+        self.__search_time = 0.0
+        self.__actors = [
+            context.Process(
+                target=_run_actor,
+                args=(
+                    player_type.__module__,
+                    player_type.__qualname__,
+                    self.__config,
+                    self.__case_queue,
+                    self.__weights_version,
+                    self.__weights_lock,
+                    self.__stop_event,
+                ),
+                daemon=True,
+            )
+            for _ in range(number_of_actors)
+        ]
+
+    def start(self) -> None:
+        for actor in self.__actors:
+            actor.start()
+
+    def get_episode(self) -> Tuple[int, List[Case]]:
+        version, cases, number_of_rollouts, search_time = self.__case_queue.get()
+        self.__number_of_rollouts += number_of_rollouts
+        self.__search_time += search_time
+        return version, cases
+
+    def get_search_statistics(self) -> Tuple[int, float]:
+        return self.__number_of_rollouts, self.__search_time
+
+    def publish_weights(self, anet: 'ANET', version: int, value_network: Optional['ValueNetwork'] = None) -> None:
+        with self.__weights_lock:
+            anet.save(self.__config.SELF_PLAY_WEIGHTS)
+            if value_network is not None:
+                value_network.save(value_network.get_weights_filename(self.__config.SELF_PLAY_WEIGHTS))
+            self.__weights_version.value = version
+
+    def stop(self) -> None:
+        self.__stop_event.set()
+        while any(actor.is_alive() for actor in self.__actors):
+            try:
+                self.__case_queue.get(timeout=0.1)
+            except Empty:
+                pass
+        for actor in self.__actors:
+            actor.join()
@@ -0,0 +1,270 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+from multiprocessing import get_context
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+Run = Tuple[str, Dict[str, Any]]  # (name, parameter overrides)
+RunResult = Dict[str, Any]
+
+# Parameters that change the self-play cases a run generates. Runs agreeing on all of them share replay buffers.
+DATA_PARAMETERS = (
+    'GAME_TYPE',
+    'SIZE',
+    'LEDGE_BOARD',
+    'REPLAY_BUFFER_SIZE',
+    'SELF_PLAY_ACTORS',
+    'WEIGHT_PUBLISHING_INTERVAL',
+    'MIN_NUMBER_OF_ROLLOUTS',
+    'SIMULATION_TIME_OUT',
+    'ANYTIME_SEARCH',
+    'ANYTIME_PHASE_EXPONENT',
+    'UCT_C',
+    'PUCT',
+    'ROLLOUT_BATCH_SIZE',
+    'MCTS_SOLVER',
+    'PERFECT_PLAY_TABLE',
+    'VALUE_NETWORK',
+    'LEAF_ROLLOUT_DEPTH',
+    'TRANSPOSITION_TABLE_SIZE',
+    'MCTS_WORKERS',
+    'HEX_SYMMETRY',
+    'HEX_SYMMETRY_AUGMENTATION',
+    'ANET_EPSILON',
+    'ANET_EPSILON_DECAY',
+)
+REPLAY_CACHE_DIRECTORY = 'replay_cache'
+RESULT_FILE = 'result.json'
+ELO_RESULTS_FILE = 'elo_results.json'  # Pairing results of the cached ANETs of all runs, kept when a sweep is resumed
+
+
+def generate_runs(spec: Dict[str, Any]) -> List[Run]:
+    """
+    Expands a sweep specification into named runs.
+
+    {"base": {NAME: value}, "grid": {NAME: [values]}, "random": {NAME: [values]}, "samples": n, "seed": s}
+    Every grid combination is run, and with "random" every combination is run with n distinct random draws of those parameters,
+    or with every draw if there are fewer. Runs with the same overrides are only run once.
+    """
+    base = spec.get('base', {})
+    grid = spec.get('grid', {})
+    random_choices = spec.get('random', {})
+    samples = spec.get('samples', 1) if random_choices else 1
+    rng = random.Random(spec.get('seed', 0))
+    number_of_draws = math.prod(len(values) for values in random_choices.values())
+
+    runs = []
+    generated_overrides = set()
+    for grid_values in itertools.product(*grid.values()):
+        # Draws are numbered in mixed radix over the random parameters and sampled without replacement
+        for draw in rng.sample(range(number_of_draws), min(samples, number_of_draws)):
+            overrides = {**base, **dict(zip(grid, grid_values))}
+            for name, values in random_choices.items():
+                draw, value_index = divmod(draw, len(values))
+                overrides[name] = values[value_index]
+            key = json.dumps(overrides, sort_keys=True)
+            if key in generated_overrides:
+                continue
+            generated_overrides.add(key)
+            varied_values = '_'.join(f'{name}={overrides[name]}' for name in (*grid, *random_choices))
+            runs.append((f'{len(runs):03d}_{varied_values}'.rstrip('_'), overrides))
+    return runs
+
+
+def get_data_key(overrides: Dict[str, Any]) -> str:
+    from config import Config
+    values = Config.from_dict(overrides).to_dict()
+    data_values = json.dumps({name: values[name] for name in DATA_PARAMETERS}, sort_keys=True)
+    return hashlib.sha1(data_values.encode()).hexdigest()[:16]
+
+
+def _limit_threads(threads_per_worker: int) -> None:
+    # Pool initializer, run before the worker first imports NumPy or TensorFlow
+    for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[variable] = str(threads_per_worker)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ['MPLBACKEND'] = 'Agg'
+
+
+def _train(run: Run, sweep_directory: str) -> RunResult:
+    """
+    Trains one configuration in its own directory and returns its result. Runs in a pool worker.
+    """
+    from config import Config
+
+    name, overrides = run
+    run_directory = os.path.join(sweep_directory, name)
+    cache_directory = os.path.join(sweep_directory, REPLAY_CACHE_DIRECTORY, get_data_key(overrides))
+    os.makedirs(os.path.join(run_directory, 'models'), exist_ok=True)
+    os.makedirs(os.path.join(run_directory, 'plots'), exist_ok=True)
+    os.chdir(run_directory)  # Models and plots are saved relative to the working directory
+
+    # Cases generated by an earlier run with the same data parameters
+    reused_cases = os.path.isdir(cache_directory) and not os.path.exists('replay_buffer')
+    if reused_cases:
+        shutil.copytree(cache_directory, 'replay_buffer')
+
+    config = Config.from_dict({**overrides, 'REPLAY_BUFFER_DIRECTORY': 'replay_buffer'})
+    # Each worker process trains a single run, so no module has read the parameters of another run
+    config.apply_to_parameters()
+    from reinforcement_learner import ReinforcementLearner
+
+    start_time = time()
+    learner = ReinforcementLearner(config)
+    learner.run()
+    wall_clock_time = time() - start_time
+    result = {
+        'name': name,
+        'overrides': overrides,
+        'final_loss': learner.get_loss_history()[-1] if learner.get_loss_history() else None,
+        'loss_history': learner.get_loss_history(),
+        'wall_clock_time': wall_clock_time,
+        'rollouts_per_second': learner.get_rollouts_per_second(),
+        'reused_cases': reused_cases,
+    }
+    del learner  # Closes the memory-mapped replay buffer
+
+    # Published with a rename, so concurrent runs never copy a partial buffer. The first run of a key wins.
+    temporary_directory = f'{cache_directory}.{os.getpid()}'
+    try:
+        shutil.copytree('replay_buffer', temporary_directory)
+        os.replace(temporary_directory, cache_directory)
+    except OSError:
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+
+    with open(RESULT_FILE, 'w') as result_file:
+        json.dump(result, result_file, indent=4)
+    return result
+
+
+def _load_result(sweep_directory: str, name: str) -> Optional[RunResult]:
+    result_path = os.path.join(sweep_directory, name, RESULT_FILE)
+    if not os.path.exists(result_path):
+        return None
+    with open(result_path) as result_file:
+        return json.load(result_file)
+
+
+def rate_results(results: List[RunResult], sweep_directory: str, evaluation_games: int, number_of_workers: int) -> None:
+    """
+    Sets the rating of every run to the Bradley-Terry Elo rating of its last cached ANET in a tournament of the cached ANETs
+    of all runs. Pairings are stored by model hashes, so resuming a sweep only plays the pairings of its new runs.
+    Runs on boards of different sizes are rated in separate pools, so only ratings of runs on the same board are comparable.
+    """
+    from elo_tournament import run_elo_tournament
+
+    ratings = run_elo_tournament(sweep_directory, os.path.join(sweep_directory, ELO_RESULTS_FILE), evaluation_games, number_of_workers)
+    final_ratings: Dict[str, Tuple[int, float]] = {}  # (episode, rating) of the last cached ANET by run
+    for model_name, rating in ratings.items():
+        name, episode = model_name.rsplit('/Agent-e', 1)
+        if name not in final_ratings or int(episode) > final_ratings[name][0]:
+            final_ratings[name] = (int(episode), rating)
+    for result in results:
+        result['rating'] = final_ratings[result['name']][1] if result['name'] in final_ratings else None
+
+
+def rank_results(results: List[RunResult]) -> List[RunResult]:
+    """
+    Orders runs by the rating of their last cached ANET, then by final training loss.
+    """
+    def key(result: RunResult) -> Tuple[float, float]:
+        rating = result.get('rating')
+        final_loss = result['final_loss'] if result['final_loss'] is not None else float('inf')
+        return -rating if rating is not None else float('inf'), final_loss
+    return sorted(results, key=key)
+
+
+def format_summary(results: List[RunResult]) -> str:
+    header = f'{"Rank":>4}  {"Elo":>7}  {"Loss":>8}  {"Minutes":>7}  {"Rollouts/s":>10}  Run'
+    lines = [header, '-' * len(header)]
+    for rank, result in enumerate(rank_results(results), start=1):
+        rating = f'{result["rating"]:.1f}' if result.get('rating') is not None else '-'
+        final_loss = f'{result["final_loss"]:.4f}' if result['final_loss'] is not None else '-'
+        cached = ' (cached cases)' if result['reused_cases'] else ''
+        lines.append(
+            f'{rank:>4}  {rating:>7}  {final_loss:>8}  {result["wall_clock_time"] / 60:>7.1f}  '
+            f'{result["rollouts_per_second"]:>10.1f}  {result["name"]}{cached}'
+        )
+    return '\n'.join(lines)
+
+
+def plot_loss_curves(results: List[RunResult], filename: str) -> None:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    for result in rank_results(results):
+        plt.plot(result['loss_history'], label=result['name'])
+    plt.xlabel('Episode')
+    plt.ylabel('Loss')
+    plt.title('Training loss per run')
+    plt.legend(fontsize='small')
+    plt.savefig(filename)
+    plt.close()
+
+
+def run_sweep(spec: Dict[str, Any], sweep_directory: str, number_of_workers: int, threads_per_worker: int, evaluation_games: int) -> List[RunResult]:
+    """
+    Trains every run of the spec not already finished in the sweep directory, rates the runs and writes the summary.
+    """
+    sweep_directory = os.path.abspath(sweep_directory)  # Workers change directory between runs
+    os.makedirs(os.path.join(sweep_directory, REPLAY_CACHE_DIRECTORY), exist_ok=True)
+    runs = generate_runs(spec)
+
+    results = {}
+    pending_runs = []
+    for run in runs:
+        result = _load_result(sweep_directory, run[0])
+        if result is None:
+            pending_runs.append(run)
+        else:
+            results[run[0]] = result
+    print(f'{len(runs)} runs, {len(results)} already finished')
+
+    # One run per worker at a time, so runs sharing a data key that are queued later can reuse its cases.
+    # Every run gets a fresh worker, since ANET reads the module-level parameters when imported and a worker
+    # kept warm would build the networks of later runs for the board and layers of its first run.
+    context = get_context('spawn')
+    with context.Pool(number_of_workers, initializer=_limit_threads, initargs=(threads_per_worker,), maxtasksperchild=1) as pool:
+        pending_results = [pool.apply_async(_train, (run, sweep_directory)) for run in pending_runs]
+        for run, pending_result in zip(pending_runs, pending_results):
+            try:
+                results[run[0]] = pending_result.get()
+                print(f'Finished {run[0]}')
+            except Exception as error:  # One failing configuration should not end the night
+                print(f'Run {run[0]} failed: {error!r}')
+
+    finished_results = [results[name] for name, _ in runs if name in results]
+    if evaluation_games > 0 and finished_results:
+        rate_results(finished_results, sweep_directory, evaluation_games, number_of_workers)
+    with open(os.path.join(sweep_directory, 'summary.json'), 'w') as summary_file:
+        json.dump(rank_results(finished_results), summary_file, indent=4)
+    summary = format_summary(finished_results)
+    with open(os.path.join(sweep_directory, 'summary.txt'), 'w') as summary_file:
+        summary_file.write(summary + '\n')
+    if finished_results:
+        plot_loss_curves(finished_results, os.path.join(sweep_directory, 'loss_curves.png'))
+    print(summary)
+    return finished_results
+
+
+if __name__ == "__main__":
+    # python sweep.py sweep.json --output sweeps/night --workers 4 --threads-per-worker 2
+    parser = argparse.ArgumentParser(description='Trains a grid or random search over the parameters and ranks the runs')
+    parser.add_argument('spec', help='JSON file with "base", "grid", "random", "samples" and "seed"')
+    parser.add_argument('--output', default='sweeps', help='Directory of the runs and the summary')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--threads-per-worker', type=int, default=2)
+    parser.add_argument('--evaluation-games', type=int, default=20, help='Greedy games per pairing of cached ANETs, 0 skips the rating')
+    arguments = parser.parse_args()
+
+    with open(arguments.spec) as spec_file:
+        sweep_spec = json.load(spec_file)
+    run_sweep(sweep_spec, arguments.output, arguments.workers, arguments.threads_per_worker, arguments.evaluation_games)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Optional
+
+from TreeNode import TreeNode
+
+
+class TranspositionTable:
+    """
+    Bounded map from Zobrist state hashes to tree nodes, letting MCTS share one node between every move order
+    that reaches the same position. The least recently used entry is evicted when the table is full.
+    An evicted node stays in the tree, it is only no longer shared with new parents.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.__capacity = capacity
+        self.__nodes: OrderedDict[int, TreeNode] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__nodes)
+
+    def get(self, state_hash: int) -> Optional[TreeNode]:
+        node = self.__nodes.get(state_hash)
+        if node is None:
+            self.misses += 1
+        else:
+            self.__nodes.move_to_end(state_hash)
+            self.hits += 1
+        return node
+
+    def put(self, state_hash: int, node: TreeNode) -> None:
+        self.__nodes[state_hash] = node
+        self.__nodes.move_to_end(state_hash)
+        if len(self.__nodes) > self.__capacity:
+            self.__nodes.popitem(last=False)
+            self.evictions += 1
+
+    def get_hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
@@ -0,0 +1,64 @@
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+from keras.activations import tanh
+from keras.layers import Dense, Input
+from keras.losses import mse
+from keras.models import Sequential
+
+from config import Config
+
+
+class ValueNetwork:
+    """
+    Value network estimating the outcome of a game from a state
+
+    ...
+
+    Outputs the expected reward for player 1 in [-1, 1], with the sign convention of the scores in the
+    Monte Carlo tree, so MCTS can evaluate a leaf with one prediction instead of a rollout. Shares ANET's hidden
+    layers, activation function and optimizer, and is trained on the game outcomes stored in the replay buffer.
+
+    Methods
+    -------
+    get_value(state: Tuple[int, ...]) -> float:
+        Expected reward for player 1.
+    fit(states: np.ndarray, outcomes: np.ndarray) -> None:
+        Trains on one minibatch of states and game outcomes.
+    save(filename: str) -> None:
+        Saves the weights.
+    load(filename: str) -> None:
+        Loads saved weights.
+    get_weights_filename(anet_filename: str) -> str:
+        Where the value weights belonging to an ANET weights file are saved.
+    """
+
+    def __init__(self, config: Optional[Config] = None) -> None:
+        config = config or Config.get_default()
+        self.__model = Sequential()
+        self.__model.add(Input(shape=(config.STATE_SIZE,)))
+        for units in config.ANET_DIMENSIONS[1:-1]:
+            self.__model.add(Dense(units, activation=config.ANET_ACTIVATION_FUNCTION))
+        self.__model.add(Dense(1, activation=tanh))
+        self.__model.compile(optimizer=config.ANET_OPTIMIZER(learning_rate=config.ANET_LEARNING_RATE), loss=mse)
+        self.loss_history: List[float] = []
+
+    def get_value(self, state: Tuple[int, ...]) -> float:
+        # Calling the model directly skips the per-call setup of predict for a single row
+        return float(self.__model(np.array([state], dtype=np.float32), training=False)[0, 0])
+
+    def fit(self, states: np.ndarray, outcomes: np.ndarray) -> None:
+        history = self.__model.fit(states, outcomes, batch_size=len(states), verbose=0)
+        self.loss_history.append(history.history['loss'][0])
+
+    def save(self, filename: str) -> None:
+        self.__model.save_weights(filename)
+
+    def load(self, filename: str) -> None:
+        self.__model.load_weights(filename)
+
+    @staticmethod
+    def get_weights_filename(anet_filename: str) -> str:
+        directory, filename = os.path.split(anet_filename)
+        return os.path.join(directory, 'value_' + filename)
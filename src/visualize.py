@@ -1,16 +1,18 @@
+from math import isqrt
 from typing import List
 
 import matplotlib.pyplot as plt
 import networkx as nx
 
 import parameters
+from world.hex import Hex
 
 
 class Visualize:
 
     __graph = nx.Graph()
     __frame_delay = parameters.FRAME_DELAY
-    __board_size = parameters.SIZE
+    __board_size = parameters.SIZE  # Follows the board passed to initialize_board
 
     @staticmethod
     def __add_node_to_graph(graph, position):
@@ -48,21 +50,17 @@ class Visualize:
 
     @classmethod
     def initialize_board(cls, state):
-        board = state[1:]
-        size = Visualize.__board_size
-        legal_positions = Visualize.__get_legal_positions(board)
-        edges = set([(0, -1), (1, -1), (1, 0), (0, 1), (-1, 1), (-1, 0)])
+        size = Visualize.__board_size = isqrt(len(state) - 1)
+        Visualize.__graph = nx.Graph()
 
         for i in range(size):
             for j in range(size):
                 Visualize.__add_node_to_graph(Visualize.__graph, (i, j))
 
-        for x, y in legal_positions:
-            for row_offset, column_offset in edges:
-                neighbor_node = (x + row_offset, y + column_offset)
-                if neighbor_node in legal_positions:
-                    Visualize.__add_edge_to_graph(
-                        Visualize.__graph, (x, y), neighbor_node)
+        for index, neighbors in enumerate(Hex.get_neighbor_table(size)):
+            for neighbor in neighbors:
+                Visualize.__add_edge_to_graph(
+                    Visualize.__graph, Hex.index_to_coordinates(index, size), Hex.index_to_coordinates(neighbor, size))
 
     @staticmethod
     def draw_board(state, winner: int, player_1: str, player_2: str, positions=None) -> None:
@@ -0,0 +1,120 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from world.hex import Hex
+
+
+class BatchHex:
+    """
+    Hex engine simulating a batch of games with NumPy, one array operation per ply for all boards.
+
+    The states are the rows of one int8 array in the (player, *board) layout of Hex, and the rules,
+    states and winners are those of Hex. After a move, the boards where the mover has a peg in every row
+    (player 1) or column (player 2) are flood-filled from the mover's starting edge, all at once,
+    by growing the reached cells through the shared neighbor table until no board changes.
+    Unlike Hex, reset also detects boards where the last mover has already won.
+
+    Methods
+    -------
+    reset(states: Optional[Sequence[Tuple[int, ...]]] = None) -> np.ndarray:
+        Starts every board from a state, or from the empty board.
+    step(actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        Plays one action on every unfinished board and returns the states and winners.
+    get_legal_actions() -> np.ndarray:
+        Legal action mask of every board, all zeros for finished boards.
+    is_final_state() -> np.ndarray:
+        Whether each game is over.
+    get_winner_ids() -> np.ndarray:
+        Winner of each board, 0 while the game is running.
+    get_states() -> List[Tuple[int, ...]]:
+        The states as tuples, for policies taking Hex states.
+    """
+
+    def __init__(self, batch_size: int, config: Optional[Config] = None) -> None:
+        self.__size: int = (config or Config.get_default()).SIZE
+        self.__length = self.__size ** 2
+        self.batch_size = batch_size
+
+        # Neighbor table padded with the index of an extra cell that is never reached
+        neighbors = Hex.get_neighbor_table(self.__size)
+        self.__neighbors = np.full((self.__length, 6), self.__length, dtype=np.intp)
+        for cell, cell_neighbors in enumerate(neighbors):
+            self.__neighbors[cell, :len(cell_neighbors)] = cell_neighbors
+
+        cells = np.arange(self.__length)
+        rows, columns = cells // self.__size, cells % self.__size
+        self.__axes = {1: rows, 2: columns}  # Every row or column must hold a peg of the player before it can win
+        self.__starting_edges = {1: rows == 0, 2: columns == 0}
+        self.__ending_edges = {1: rows == self.__size - 1, 2: columns == self.__size - 1}
+
+        self.__states = np.zeros((batch_size, 1 + self.__length), dtype=np.int8)
+        self.__winners = np.zeros(batch_size, dtype=np.int8)
+        self.reset()
+
+    def reset(self, states: Optional[Sequence[Tuple[int, ...]]] = None) -> np.ndarray:
+        if states is None:
+            self.__states[:] = 0
+            self.__states[:, 0] = 1
+        else:
+            assert len(states) == self.batch_size, 'One state per board'
+            self.__states[:] = states
+        self.__winners[:] = 0
+        for player_id in (1, 2):
+            # The player who moved last is the only one who can have won
+            self.__update_winners(np.flatnonzero(self.__states[:, 0] == Hex.opposite_player[player_id]), player_id)
+        return self.__states
+
+    def get_legal_actions(self) -> np.ndarray:
+        legal_actions = (self.__states[:, 1:] == 0).astype(np.int8)
+        legal_actions[self.__winners != 0] = 0
+        return legal_actions
+
+    def is_final_state(self) -> np.ndarray:
+        return self.__winners != 0
+
+    def get_winner_ids(self) -> np.ndarray:
+        return self.__winners
+
+    def get_states(self) -> List[Tuple[int, ...]]:
+        return list(map(tuple, self.__states.tolist()))
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Actions of finished boards are ignored.
+        """
+        boards = np.flatnonzero(self.__winners == 0)
+        actions = np.asarray(actions)[boards]
+        assert np.all((0 <= actions) & (actions < self.__length)), 'Illegal action, index out of range'
+        assert np.all(self.__states[boards, 1 + actions] == 0), 'Illegal action, cell is occupied'
+
+        players = self.__states[boards, 0]
+        self.__states[boards, 1 + actions] = players
+        self.__states[boards, 0] = 3 - players
+        for player_id in (1, 2):
+            self.__update_winners(boards[players == player_id], player_id)
+        return self.__states, self.__winners
+
+    def __update_winners(self, boards: np.ndarray, player_id: int) -> None:
+        """
+        Sets player_id as the winner of the given boards where its pegs connect its edges.
+        """
+        stones = self.__states[boards, 1:] == player_id
+        stone_boards, stone_cells = np.nonzero(stones)
+        covered_axes = np.zeros((len(boards), self.__size), dtype=bool)
+        covered_axes[stone_boards, self.__axes[player_id][stone_cells]] = True
+        candidates = covered_axes.all(axis=1)
+        boards, stones = boards[candidates], stones[candidates]
+        if len(boards) == 0:
+            return
+
+        reached = stones & self.__starting_edges[player_id]
+        padded = np.zeros((len(boards), self.__length + 1), dtype=bool)
+        while True:
+            padded[:, :-1] = reached
+            grown = stones & (reached | padded[:, self.__neighbors].any(axis=2))
+            if np.array_equal(grown, reached):
+                break
+            reached = grown
+        self.__winners[boards[(reached & self.__ending_edges[player_id]).any(axis=1)]] = player_id
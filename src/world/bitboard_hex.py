@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from config import Config
+from world.hex import Hex
+from world.simulated_world import SimulatedWorld
+from world.zobrist import Zobrist
+
+
+class BitboardHex(SimulatedWorld):
+    """
+    Hex engine storing each player's stones as an integer bitboard.
+
+    Connectivity is tracked incrementally with a disjoint-set over the cells plus two virtual edge nodes
+    per player, so checking for a winner after a move is a single find on each edge node.
+    Produces the same states and winners as Hex.
+    """
+
+    opposite_player = {
+        1: 2,
+        2: 1,
+    }
+
+    def __init__(self, state: Optional[Tuple[int, ...]] = None, config: Optional[Config] = None):
+        self.__size: int = (config or Config.get_default()).SIZE
+        self.__length = self.__size ** 2
+        self.__full_mask = (1 << self.__length) - 1
+        self.__neighbors = Hex.get_neighbor_table(self.__size)
+        self.__cell_keys, self.__player_keys = Zobrist.get_keys(self.__length)
+
+        # Virtual edge nodes follow the cells in the disjoint-set
+        self.__start_node = {1: self.__length, 2: self.__length + 1}
+        self.__end_node = {1: self.__length + 2, 2: self.__length + 3}
+        self.__starting_edge = {
+            1: self.__edge_mask(i for i in range(self.__size)),
+            2: self.__edge_mask(i * self.__size for i in range(self.__size)),
+        }
+        self.__ending_edge = {
+            1: self.__edge_mask(self.__length - (i + 1) for i in range(self.__size)),
+            2: self.__edge_mask(self.__size * (i + 1) - 1 for i in range(self.__size)),
+        }
+        self.reset(state)
+
+    @staticmethod
+    def __edge_mask(indices) -> int:
+        mask = 0
+        for index in indices:
+            mask |= 1 << index
+        return mask
+
+    def reset(self, state: Optional[Tuple[int, ...]] = None) -> Tuple[int, ...]:
+        self.__is_final_state = False
+        self.__bitboards = {1: 0, 2: 0}
+        self.__parents: List[int] = list(range(self.__length + 4))
+        self.__ranks: List[int] = [0] * (self.__length + 4)
+        self.__board = [0] * self.__length
+        if state is None:
+            self.__player_id = 1
+        else:
+            self.__player_id = state[0]
+            for action, player_id in enumerate(state[1:]):
+                if player_id != 0:
+                    self.__place(action, player_id)
+        self.__hash = Zobrist.hash_state(self.get_state())
+        return self.get_state()
+
+    @staticmethod
+    def index_to_coordinates(index: int, size: int) -> Tuple[int, int]:
+        return index // size, index % size
+
+    @staticmethod
+    def get_valid_actions(state: Tuple[int, ...]) -> Tuple[int, ...]:
+        return tuple(1 if i == 0 else 0 for i in state[1:])
+
+    def get_legal_actions(self) -> Tuple[int, ...]:
+        empty = ~(self.__bitboards[1] | self.__bitboards[2]) & self.__full_mask
+        return tuple((empty >> i) & 1 for i in range(self.__length))
+
+    def generate_state(self, action: int) -> Tuple[int, ...]:
+        next_board = list(self.__board)
+        next_board[action] = self.__player_id
+        return (BitboardHex.opposite_player[self.__player_id], *next_board)
+
+    def get_state_hash(self) -> int:
+        return self.__hash
+
+    def generate_state_hash(self, action: int) -> int:
+        return self.__hash ^ self.__move_key(action, self.__player_id)
+
+    def is_final_state(self) -> bool:
+        return self.__is_final_state
+
+    def step(self, action: int) -> Tuple[Tuple[int, ...], int]:
+        assert 0 <= action < self.__length, 'Illegal action, index out of range'
+        assert not ((self.__bitboards[1] | self.__bitboards[2]) >> action) & 1, 'Illegal action, cell is occupied'
+
+        player_id = self.__player_id
+        self.__place(action, player_id)
+        self.__hash ^= self.__move_key(action, player_id)
+        self.__player_id = BitboardHex.opposite_player[player_id]
+        self.__is_final_state = self.__find(self.__start_node[player_id]) == self.__find(self.__end_node[player_id])
+        return self.get_state(), self.get_winner_id()
+
+    def get_winner_id(self) -> int:
+        if self.__is_final_state:
+            return BitboardHex.opposite_player[self.__player_id]
+        else:
+            return 0
+
+    def get_state(self) -> Tuple[int, ...]:
+        return (self.__player_id, *self.__board)
+
+    def __move_key(self, action: int, player_id: int) -> int:
+        opposite_player = BitboardHex.opposite_player[player_id]
+        return self.__cell_keys[action][player_id] ^ self.__player_keys[player_id] ^ self.__player_keys[opposite_player]
+
+    def __place(self, action: int, player_id: int) -> None:
+        bit = 1 << action
+        bitboard = self.__bitboards[player_id] | bit
+        self.__bitboards[player_id] = bitboard
+        self.__board[action] = player_id
+
+        for neighbor in self.__neighbors[action]:
+            if (bitboard >> neighbor) & 1:
+                self.__union(action, neighbor)
+        if self.__starting_edge[player_id] & bit:
+            self.__union(action, self.__start_node[player_id])
+        if self.__ending_edge[player_id] & bit:
+            self.__union(action, self.__end_node[player_id])
+
+    def __find(self, node: int) -> int:
+        parents = self.__parents
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]  # Path halving
+            node = parents[node]
+        return node
+
+    def __union(self, u: int, v: int) -> None:
+        u, v = self.__find(u), self.__find(v)
+        if u == v:
+            return
+        if self.__ranks[u] < self.__ranks[v]:
+            u, v = v, u
+        self.__parents[v] = u
+        if self.__ranks[u] == self.__ranks[v]:
+            self.__ranks[u] += 1
+
+    def __str__(self) -> str:
+        return str(self.get_state())
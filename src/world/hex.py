@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from collections import deque
-from typing import Optional, Set, Tuple
+from typing import Dict, Optional, Tuple
 
-import parameters
+from config import Config
 from world.simulated_world import SimulatedWorld
+from world.zobrist import Zobrist
 
 
 class Hex(SimulatedWorld):
@@ -14,9 +15,13 @@ class Hex(SimulatedWorld):
         2: 1,
     }
 
-    def __init__(self, state: Optional[Tuple[int, ...]] = None):
-        self.__size: int = parameters.SIZE
+    __neighbor_tables: Dict[int, Tuple[Tuple[int, ...], ...]] = {}
+
+    def __init__(self, state: Optional[Tuple[int, ...]] = None, config: Optional[Config] = None):
+        self.__size: int = (config or Config.get_default()).SIZE
         self.__length = self.__size ** 2
+        self.__neighbors = Hex.get_neighbor_table(self.__size)
+        self.__cell_keys, self.__player_keys = Zobrist.get_keys(self.__length)
         self.__ending_indices = {
             1: set([self.__length - (i + 1) for i in range(self.__size)]),
             2: set([self.__size * (i + 1) - 1 for i in range(self.__size)]),
@@ -37,12 +42,32 @@ class Hex(SimulatedWorld):
             for action, player_id in enumerate(self.__board):
                 if player_id != 0:
                     self.__modified_list[player_id][self.__player_axis(player_id, action)] = True
-        return self.__get_state()
+        self.__hash = Zobrist.hash_state(self.get_state())
+        return self.get_state()
 
     @staticmethod
     def index_to_coordinates(index: int, size: int) -> Tuple[int, int]:
         return index // size, index % size
 
+    @staticmethod
+    def get_neighbor_table(size: int) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Returns the adjacent cell indices of every cell on a board of the given size.
+        The table is built once per board size and shared by every caller.
+        """
+        if size not in Hex.__neighbor_tables:
+            table = []
+            for index in range(size ** 2):
+                row, column = Hex.index_to_coordinates(index, size)
+                neighbors = []
+                for row_offset, column_offset in ((-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (1, -1)):
+                    neighbor_row, neighbor_column = row + row_offset, column + column_offset
+                    if 0 <= neighbor_row < size and 0 <= neighbor_column < size:
+                        neighbors.append(neighbor_row * size + neighbor_column)
+                table.append(tuple(neighbors))
+            Hex.__neighbor_tables[size] = tuple(table)
+        return Hex.__neighbor_tables[size]
+
     # Used by BasicClientActor
     @staticmethod
     def get_valid_actions(state: Tuple[int, ...]) -> Tuple[int, ...]:
@@ -56,6 +81,12 @@ class Hex(SimulatedWorld):
         next_board[action] = self.__player_id
         return (Hex.opposite_player[self.__player_id], *next_board)
 
+    def get_state_hash(self) -> int:
+        return self.__hash
+
+    def generate_state_hash(self, action: int) -> int:
+        return self.__hash ^ self.__move_key(action, self.__player_id)
+
     def is_final_state(self) -> bool:
         return self.__is_final_state
 
@@ -70,24 +101,26 @@ class Hex(SimulatedWorld):
             return
 
         # Sufficient amount of pegs, check for path using BFS
+        board = self.__board
+        ending_indices = self.__ending_indices[opposite_player]
         visited_cells = set()
         for i in range(self.__size):
             index = i if opposite_player == 1 else i * self.__size
-            if self.__board[index] == opposite_player and index not in visited_cells:
+            if board[index] == opposite_player and index not in visited_cells:
 
-                # BFS
+                # BFS, cells are marked as visited when enqueued
                 visited_cells.add(index)
                 queue = deque()
                 queue.append(index)
                 while len(queue) > 0:
                     current_cell = queue.popleft()
-                    for neighbor in self.__get_filled_neighbors(current_cell, opposite_player):
-                        if neighbor not in visited_cells and neighbor not in queue:
-                            queue.append(neighbor)
-                            if neighbor in self.__ending_indices[opposite_player]:
+                    for neighbor in self.__neighbors[current_cell]:
+                        if board[neighbor] == opposite_player and neighbor not in visited_cells:
+                            if neighbor in ending_indices:
                                 self.__is_final_state = True
                                 return
-                    visited_cells.add(current_cell)
+                            visited_cells.add(neighbor)
+                            queue.append(neighbor)
         self.__is_final_state = False
         return
 
@@ -96,10 +129,11 @@ class Hex(SimulatedWorld):
         assert self.__board[action] == 0, 'Illegal action, cell is occupied'
 
         self.__board[action] = self.__player_id
+        self.__hash ^= self.__move_key(action, self.__player_id)
         self.__modified_list[self.__player_id][self.__player_axis(self.__player_id, action)] = True  # Used to speed up winning condition check
         self.__player_id = Hex.opposite_player[self.__player_id]
         self.__update_final_state()
-        return self.__get_state(), self.get_winner_id()
+        return self.get_state(), self.get_winner_id()
 
     def get_winner_id(self) -> int:
         if self.__is_final_state:
@@ -107,35 +141,20 @@ class Hex(SimulatedWorld):
         else:
             return 0
 
-    def __get_state(self) -> Tuple[int, ...]:
+    def get_state(self) -> Tuple[int, ...]:
         return (self.__player_id, *self.__board)
 
+    def __move_key(self, action: int, player_id: int) -> int:
+        """
+        Zobrist delta of player_id placing a peg on action and passing the turn.
+        """
+        opposite_player = Hex.opposite_player[player_id]
+        return self.__cell_keys[action][player_id] ^ self.__player_keys[player_id] ^ self.__player_keys[opposite_player]
+
     def __player_axis(self, player_id: int, action: int) -> int:
         if player_id == 1:
             return action // self.__size
         return action % self.__size
 
-    def __get_filled_neighbors(self, index: int, player_id: int) -> Set[int]:
-        def is_cell_neighbor(cell: int) -> bool:
-            if not (0 <= cell < self.__length):
-                return False
-            if abs((cell % self.__size) - (index % self.__size)) > 1:
-                return False
-            if self.__board[cell] != player_id:
-                return False
-            return True
-
-        return set(filter(is_cell_neighbor, self.__get_neighboring_indices(index)))
-
-    def __get_neighboring_indices(self, index: int) -> Set[int]:
-        return {
-            index - self.__size,
-            index + self.__size,
-            index + 1,
-            index - 1,
-            index - self.__size + 1,
-            index + self.__size - 1
-        }
-
     def __str__(self) -> str:
-        return str(self.__get_state())
+        return str(self.get_state())
@@ -0,0 +1,44 @@
+from typing import Sequence, Tuple
+
+
+class HexSymmetry:
+    """
+    180 degree rotation of (player, *board) Hex states.
+
+    Rotating the board maps cell i to cell n - 1 - i of an n cell board. The neighbor offsets of a cell
+    are closed under negation and each player's two edges swap places, so a position and its rotation
+    are equivalent with the same player to move. The canonical state of a position is the
+    lexicographically smaller of the two boards, and actions and distributions are remapped between them.
+    """
+
+    @staticmethod
+    def rotate_state(state: Tuple[int, ...]) -> Tuple[int, ...]:
+        return (state[0], *state[:0:-1])
+
+    @staticmethod
+    def rotate_action(action: int, board_length: int) -> int:
+        return board_length - 1 - action
+
+    @staticmethod
+    def rotate_distribution(distribution: Sequence[float]) -> Tuple[float, ...]:
+        return tuple(distribution[::-1])
+
+    @staticmethod
+    def canonicalize(state: Tuple[int, ...]) -> Tuple[Tuple[int, ...], bool]:
+        """
+        Returns (canonical state, whether the canonical state is the rotation of the given state).
+        A symmetric state is its own canonical state.
+        """
+        rotated_state = HexSymmetry.rotate_state(state)
+        if rotated_state < state:
+            return rotated_state, True
+        return state, False
+
+    @staticmethod
+    def generate_state(state: Tuple[int, ...], action: int) -> Tuple[int, ...]:
+        """
+        The state after the player to move places a peg on action, without a world.
+        """
+        board = list(state[1:])
+        board[action] = state[0]
+        return (2 if state[0] == 1 else 1, *board)
@@ -1,8 +1,9 @@
 import math
 from typing import List, Optional, Tuple
 
-import parameters
+from config import Config
 from world.simulated_world import SimulatedWorld
+from world.zobrist import Zobrist
 
 
 class Ledge(SimulatedWorld):
@@ -11,18 +12,22 @@ class Ledge(SimulatedWorld):
         2: 1
     }
 
-    def __init__(self, state: Optional[Tuple[int, ...]] = None):
-        self.__size = parameters.SIZE
-        self.__action_space = parameters.NUMBER_OF_ACTIONS
+    def __init__(self, state: Optional[Tuple[int, ...]] = None, config: Optional[Config] = None):
+        config = config or Config.get_default()
+        self.__size = config.SIZE
+        self.__action_space = config.NUMBER_OF_ACTIONS
+        self.__initial_board = config.LEDGE_BOARD
+        self.__cell_keys, self.__player_keys = Zobrist.get_keys(self.__size)
         self.reset(state)
 
     def reset(self, state: Optional[Tuple[int, ...]] = None) -> Tuple[int, ...]:
         if state is None:
             self.__player_id = 1
-            self.__board = list(parameters.LEDGE_BOARD)
+            self.__board = list(self.__initial_board)
         else:
             self.__player_id, *self.__board = list(state)
-        return self.__get_state()
+        self.__hash = Zobrist.hash_state(self.get_state())
+        return self.get_state()
 
     def is_final_state(self) -> bool:
         return 2 not in self.__board
@@ -33,14 +38,21 @@ class Ledge(SimulatedWorld):
         else:
             return 0
 
+    def get_state_hash(self) -> int:
+        return self.__hash
+
+    def generate_state_hash(self, action: int) -> int:
+        return self.__hash ^ self.__move_key(action)
+
     def step(self, action: int) -> Tuple[Tuple[int, ...], int]:
+        self.__hash ^= self.__move_key(action)
         coin_position, landing_position = self.index_to_tuple(action)
         if landing_position >= 0:
             self.__board[landing_position], self.__board[coin_position] = self.__board[coin_position], 0
         else:
             self.__board[coin_position] = 0
         self.__player_id = Ledge.opposite_player[self.__player_id]
-        return self.__get_state(), self.get_winner_id()
+        return self.get_state(), self.get_winner_id()
 
     def get_legal_actions(self) -> Tuple[int, ...]:
         legal_actions = []
@@ -48,7 +60,7 @@ class Ledge(SimulatedWorld):
             legal_actions.append(int(self.__is_legal_action(self.__board, self.index_to_tuple(action))))
         return tuple(legal_actions)
 
-    def __get_state(self) -> Tuple[int, ...]:
+    def get_state(self) -> Tuple[int, ...]:
         return (self.__player_id, *self.__board)
 
     def generate_state(self, action: int) -> Tuple[int, ...]:
@@ -58,7 +70,18 @@ class Ledge(SimulatedWorld):
             board[landing_position], board[coin_position] = board[coin_position], 0
         else:
             board[coin_position] = 0
-        return (self.__player_id, *board)
+        return (Ledge.opposite_player[self.__player_id], *board)
+
+    def __move_key(self, action: int) -> int:
+        """
+        Zobrist delta of moving or picking up the coin of action and passing the turn.
+        """
+        coin_position, landing_position = self.index_to_tuple(action)
+        coin = self.__board[coin_position]
+        key = self.__cell_keys[coin_position][coin]
+        if landing_position >= 0:
+            key ^= self.__cell_keys[landing_position][coin]
+        return key ^ self.__player_keys[self.__player_id] ^ self.__player_keys[Ledge.opposite_player[self.__player_id]]
 
     def __is_legal_action(self, board: List[int], action: Tuple[int, int]) -> bool:
         coin_position, landing_position = action
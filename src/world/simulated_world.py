@@ -12,6 +12,10 @@ class SimulatedWorld(ABC):
     def reset(self, state: Optional[Tuple[int, ...]] = None) -> Tuple[int, ...]:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_state(self) -> Tuple[int, ...]:
+        raise NotImplementedError
+
     @abstractmethod
     def is_final_state(self) -> bool:
         raise NotImplementedError
@@ -27,3 +31,17 @@ class SimulatedWorld(ABC):
     @abstractmethod
     def generate_state(self, action: int) -> Tuple[int, ...]:
         raise NotImplementedError
+
+    @abstractmethod
+    def get_state_hash(self) -> int:
+        """
+        Zobrist hash of the current state, maintained incrementally by step.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def generate_state_hash(self, action: int) -> int:
+        """
+        Zobrist hash of the state generate_state(action) returns.
+        """
+        raise NotImplementedError
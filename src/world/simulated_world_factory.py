@@ -1,8 +1,9 @@
 from typing import Optional, Tuple
 
-import parameters
+from config import Config
 from game import Game
 
+from .bitboard_hex import BitboardHex
 from .hex import Hex
 from .ledge import Ledge
 from .simulated_world import SimulatedWorld
@@ -11,8 +12,11 @@ from .simulated_world import SimulatedWorld
 class SimulatedWorldFactory:
 
     @staticmethod
-    def get_simulated_world(state: Optional[Tuple[int, ...]] = None) -> SimulatedWorld:
-        if parameters.GAME_TYPE == Game.Ledge:
-            return Ledge(state)
+    def get_simulated_world(state: Optional[Tuple[int, ...]] = None, config: Optional[Config] = None) -> SimulatedWorld:
+        config = config or Config.get_default()
+        if config.GAME_TYPE == Game.Ledge:
+            return Ledge(state, config)
+        elif config.USE_BITBOARD_HEX:
+            return BitboardHex(state, config)
         else:
-            return Hex(state)
+            return Hex(state, config)
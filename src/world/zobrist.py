@@ -0,0 +1,41 @@
+from random import Random
+from typing import Dict, Tuple
+
+
+class Zobrist:
+    """
+    64-bit Zobrist keys for (player, *board) states.
+
+    A state's hash is the XOR of one key per occupied cell and piece value, and one key for the player to move,
+    so worlds update it incrementally in O(1) per move. The keys are drawn from a fixed seed,
+    which makes hashes agree between processes and runs.
+    """
+
+    SEED = 0x5EED
+    PIECE_VALUES = 3  # Empty, 1 and 2 for both Hex and Ledge
+
+    __tables: Dict[int, Tuple[Tuple[Tuple[int, ...], ...], Tuple[int, ...]]] = {}
+
+    @staticmethod
+    def get_keys(board_length: int) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[int, ...]]:
+        """
+        Returns (cell keys indexed [cell][piece], player keys indexed [player]) for a board length.
+        Keys for empty cells and player 0 are 0, so they never change a hash.
+        """
+        if board_length not in Zobrist.__tables:
+            rng = Random(Zobrist.SEED + board_length)
+            cell_keys = tuple(
+                (0, *(rng.getrandbits(64) for _ in range(Zobrist.PIECE_VALUES - 1)))
+                for _ in range(board_length)
+            )
+            player_keys = (0, rng.getrandbits(64), rng.getrandbits(64))
+            Zobrist.__tables[board_length] = (cell_keys, player_keys)
+        return Zobrist.__tables[board_length]
+
+    @staticmethod
+    def hash_state(state: Tuple[int, ...]) -> int:
+        cell_keys, player_keys = Zobrist.get_keys(len(state) - 1)
+        state_hash = player_keys[state[0]]
+        for cell, piece in enumerate(state[1:]):
+            state_hash ^= cell_keys[cell][piece]
+        return state_hash